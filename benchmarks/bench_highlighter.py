@@ -0,0 +1,84 @@
+# Бенчмарк подсветки синтаксиса Робота на программе из 50k строк:
+# время сканирования строк, первичной подсветки документа и задержка на одно нажатие клавиши.
+# Для сравнения замеряется прежняя подсветка с отдельным QRegularExpression на каждое слово.
+# Запуск: python benchmarks/bench_highlighter.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtGui import QGuiApplication, QTextDocument, QTextCursor, QSyntaxHighlighter, QTextCharFormat, QColor
+from PyQt6.QtCore import QRegularExpression
+
+from robot_parser import lex_line, highlight_spans, HIGHLIGHT_WORDS
+from robot_executor import RobotSyntaxHighlighter
+from bench_parser import make_program
+
+LINE_COUNT = 50_000
+KEYSTROKES = 200
+
+
+class LegacyHighlighter(QSyntaxHighlighter):
+    """Прежняя подсветка: отдельное выражение на каждое слово, ~30 проходов по строке"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        text_format = QTextCharFormat()
+        text_format.setForeground(QColor("#FF79C6"))
+        self.highlighting_rules = [(QRegularExpression(r"\b" + word + r"\b"), text_format) for word in HIGHLIGHT_WORDS]
+        self.highlighting_rules.append((QRegularExpression(r"\b\d+\b"), text_format))
+        self.highlighting_rules.append((QRegularExpression(r"\|[^\n]*"), text_format))
+
+    def highlightBlock(self, text):
+        for pattern, text_format in self.highlighting_rules:
+            match_iterator = pattern.globalMatch(text)
+            while match_iterator.hasNext():
+                match = match_iterator.next()
+                self.setFormat(match.capturedStart(), match.capturedLength(), text_format)
+
+
+def measure_highlighter(highlighter_class, code):
+    """Первичная подсветка документа и задержка нажатия клавиши в середине документа, с"""
+    document = QTextDocument()
+    document.setPlainText(code)
+
+    start = time.perf_counter()
+    highlighter = highlighter_class(document)
+    initial = time.perf_counter() - start
+
+    # Нажатия клавиш: вставка символа в строку в середине документа, подсветка выполняется синхронно
+    cursor = QTextCursor(document.findBlockByNumber(document.blockCount() // 2))
+    cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
+    latencies = []
+    for _ in range(KEYSTROKES):
+        start = time.perf_counter()
+        cursor.insertText('x')
+        latencies.append(time.perf_counter() - start)
+
+    highlighter.setDocument(None)
+    latencies.sort()
+    return initial, latencies[len(latencies) // 2], latencies[-1]
+
+
+def main():
+    app = QGuiApplication(sys.argv)
+    code = make_program(LINE_COUNT)
+    lines = code.split('\n')
+
+    start = time.perf_counter()
+    for line in lines:
+        highlight_spans(lex_line(line))
+    scan = time.perf_counter() - start
+    print(f"lex_line + highlight_spans: {len(lines)} строк за {scan * 1000:.1f} мс ({scan * 1e6 / len(lines):.2f} мкс/строка)")
+
+    print(f"{'подсветка':>22} {'весь документ, мс':>18} {'нажатие, медиана, мс':>22} {'нажатие, макс, мс':>18}")
+    for name, highlighter_class in (("прежняя (30 regex)", LegacyHighlighter),
+                                    ("RobotSyntaxHighlighter", RobotSyntaxHighlighter)):
+        initial, median, worst = measure_highlighter(highlighter_class, code)
+        print(f"{name:>22} {initial * 1000:>18.1f} {median * 1000:>22.3f} {worst * 1000:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Бенчмарк оптимизатора байт-кода: выполнение программ с сериями ходов и циклами
+# "идти, пока свободно" с оптимизированным байт-кодом (Program.fast_code) и без него.
+# Запуск: python benchmarks/bench_optimizer.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_parser import parse_program
+from robot_compiler import compile_program, Program
+from robot_field import Field
+from robot_machine import RobotMachine
+
+# Робот ходит по пустому полю от стены до стены
+WALK_PROGRAM = """нц для i от 1 до {repeat}
+  нц пока справа свободно
+    вправо
+  кц
+  нц пока слева свободно
+    влево
+  кц
+кц
+"""
+
+# Серии одинаковых ходов
+MOVES_PROGRAM = "нц для i от 1 до {repeat}\n" + "вправо\n" * 20 + "влево\n" * 20 + "кц\n"
+
+
+def measure(program, size):
+    machine = RobotMachine(Field(size))
+    machine.load(program)
+    start = time.perf_counter()
+    steps = machine.run()
+    return steps, time.perf_counter() - start
+
+
+def main():
+    print(f"{'программа':>10} {'поле':>6} {'инструкций':>12} {'без оптимизации, мс':>21} {'с оптимизацией, мс':>20}")
+    cases = [
+        ('проход', WALK_PROGRAM.format(repeat=100), 1000),
+        ('проход', WALK_PROGRAM.format(repeat=100), 2000),
+        ('серии', MOVES_PROGRAM.format(repeat=10_000), 30),
+    ]
+    for name, code, size in cases:
+        program = compile_program(parse_program(code))
+        plain = Program(program.code, program.lines, program.counter_names)
+        steps, plain_time = measure(plain, size)
+        _, fast_time = measure(program, size)
+        print(f"{name:>10} {size:>6} {steps:>12} {plain_time * 1000:>21.1f} {fast_time * 1000:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
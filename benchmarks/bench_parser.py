@@ -0,0 +1,87 @@
+# Бенчмарк парсера программ Робота на синтетических программах 10k-100k строк:
+# полный разбор (parse_program) и повторный разбор после правки одной строки (IncrementalParser).
+# Запуск: python benchmarks/bench_parser.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_parser import parse_program, lex_line, IncrementalParser
+
+BLOCK = """нц пока справа свободно
+  вправо
+  закрасить
+кц
+если снизу стена то
+  вверх
+иначе
+  вниз
+все
+нц для i от 1 до 3
+  влево
+кц
+нц
+  вверх
+кц при сверху свободно
+"""
+
+
+def make_program(line_count):
+    """Программа из повторяющихся блоков примерно на line_count строк"""
+    block_lines = BLOCK.count('\n')
+    return BLOCK * (line_count // block_lines)
+
+
+def first_parse(lines):
+    parser = IncrementalParser()
+    parser.edit(0, 0, lines)
+    return parser.parse()
+
+
+def reparse(lines, index):
+    """Разбор программы, затем правка команды в строке index и разбор, как в редакторе.
+
+    Возвращает время правки и разбора: (строка изменена, строка вставлена)
+    """
+    parser = IncrementalParser()
+    parser.edit(0, 0, lines)
+    parser.parse()
+    text = lines[index][0] + ' | правка'
+    times = []
+    for removed in (1, 0):
+        start = time.perf_counter()
+        parser.edit(index, removed, [(text, lex_line(text))])
+        parser.parse()
+        times.append(time.perf_counter() - start)
+    return tuple(times)
+
+
+def measure(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print(f"{'строк':>8} {'parse_program, мс':>18} {'мкс/строка':>12} {'первый разбор, мс':>18} "
+          f"{'правка строки, мс':>18} {'вставка строки, мс':>19}")
+    for line_count in (10_000, 30_000, 100_000):
+        code = make_program(line_count)
+        lines = [(text, lex_line(text)) for text in code.split('\n')]
+        parse_time = measure(parse_program, code)
+        first_time = measure(first_parse, lines)
+        # Команда внутри блока в середине программы
+        index = next(i for i in range(len(lines) // 2, len(lines)) if lines[i][0] == '  вправо')
+        edit_time, insert_time = min(reparse(lines, index) for _ in range(3))
+        print(f"{len(lines):>8} {parse_time * 1000:>18.1f} {parse_time * 1e6 / len(lines):>12.2f} "
+              f"{first_time * 1000:>18.1f} {edit_time * 1000:>18.2f} {insert_time * 1000:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Бенчмарк запуска IDE: время до первой отрисовки окна и до завершения первого
+# запуска программы (F5 сразу после появления окна), а также время повторного запуска.
+# Запуск: python benchmarks/bench_startup.py [программа.cortex]
+
+import os
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QObject, QEvent, QTimer
+
+from main_window import ModernMainWindow
+
+IMPORTED = time.perf_counter()
+
+# Программа по умолчанию. Ошибка компиляции тоже завершает запуск, на замер это не влияет
+SAMPLE_PROGRAM = 'print("Привет")\n'
+
+
+class FirstPaint(QObject):
+    """Запоминает время первого события отрисовки любого виджета"""
+
+    def __init__(self):
+        super().__init__()
+        self.time = None
+
+    def eventFilter(self, obj, event):
+        if self.time is None and event.type() == QEvent.Type.Paint:
+            self.time = time.perf_counter()
+        return False
+
+
+def ms(seconds):
+    return f"{seconds * 1000:8.1f} мс"
+
+
+def main():
+    code = SAMPLE_PROGRAM
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as file:
+            code = file.read()
+
+    app = QApplication(sys.argv)
+    first_paint = FirstPaint()
+    app.installEventFilter(first_paint)
+
+    window = ModernMainWindow()
+    constructed = time.perf_counter()
+    window.show()
+
+    service = window.compiler_service
+    runs = []  # (начало, конец) запусков
+
+    def run():
+        window.tab_widget.currentWidget().setPlainText(code)
+        runs.append([time.perf_counter(), None])
+        window.run_code()
+
+    def run_finished():
+        runs[-1][1] = time.perf_counter()
+        if len(runs) < 2:
+            # Повторный запуск того же текста: процесс уже прогрет, компиляция берется из кэша
+            QTimer.singleShot(0, run)
+        else:
+            app.quit()
+
+    service.finished.connect(run_finished)
+
+    def run_after_paint():
+        if first_paint.time is None:
+            QTimer.singleShot(1, run_after_paint)
+        else:
+            run()
+
+    QTimer.singleShot(0, run_after_paint)
+    app.exec()
+    service.shutdown()
+
+    print(f"Импорт модулей:              {ms(IMPORTED - STARTED)}")
+    print(f"Создание окна:               {ms(constructed - IMPORTED)}")
+    print(f"Первая отрисовка:            {ms(first_paint.time - STARTED)}")
+    print(f"Первый запуск завершен:      {ms(runs[0][1] - STARTED)} (запуск {ms(runs[0][1] - runs[0][0]).strip()})")
+    print(f"Повторный запуск:            {ms(runs[1][1] - runs[1][0])}")
+
+
+if __name__ == "__main__":
+    main()
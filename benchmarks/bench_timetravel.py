@@ -0,0 +1,72 @@
+# Бенчмарк перехода по шкале времени: запись трассы выполнения длиной около
+# миллиона шагов и переходы к случайным шагам (RobotMachine.seek).
+# Запуск: python benchmarks/bench_timetravel.py
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_parser import parse_program
+from robot_compiler import compile_program
+from robot_field import Field, WALL
+from robot_machine import RobotMachine
+from robot_trace import ExecutionTrace
+
+# Робот закрашивает ряды поля, спускаясь на ряд после каждого прохода
+PROGRAM = """нц для k от 1 до 1200
+  нц пока справа свободно
+    вправо
+    закрасить
+  кц
+  если снизу свободно то
+    вниз
+  иначе
+    вверх
+  все
+  нц пока слева свободно
+    влево
+  кц
+кц
+"""
+
+FIELD_SIZE = 300
+SEEKS = 200
+
+
+def main():
+    field = Field(FIELD_SIZE)
+    for y in range(0, FIELD_SIZE, 7):
+        field.set(FIELD_SIZE * 3 // 4, y, WALL)
+
+    machine = RobotMachine(field)
+    machine.load(compile_program(parse_program(PROGRAM)))
+    trace = ExecutionTrace()
+    machine.start_trace(trace)
+
+    start = time.perf_counter()
+    machine.run()
+    record_time = time.perf_counter() - start
+    memory = len(trace.commands) + len(trace.pcs) * trace.pcs.itemsize
+    keyframes = sum(len(keyframe.cells) for keyframe in trace.keyframes)
+    print(f"Шагов записано:      {len(trace)}")
+    print(f"Запись выполнения:   {record_time * 1000:8.1f} мс")
+    print(f"Шаги трассы:         {memory / len(trace):8.1f} байт/шаг")
+    print(f"Ключевые кадры:      {len(trace.keyframes)} шт., {keyframes / 1024:.1f} КБ")
+
+    rng = random.Random(1)
+    times = []
+    for _ in range(SEEKS):
+        step = rng.randrange(len(trace) + 1)
+        start = time.perf_counter()
+        machine.seek(trace, step)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(f"Переход (медиана):   {times[len(times) // 2] * 1000:8.1f} мс")
+    print(f"Переход (максимум):  {times[-1] * 1000:8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
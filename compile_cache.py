@@ -0,0 +1,110 @@
+# Кэш результатов компиляции Cortex в памяти (для вкладок IDE)
+# и кэш на диске для файлов .cortex.
+# Ключ - хэш исходного текста, поэтому неизмененная программа не разбирается заново.
+
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+
+# Каталог кэша рядом с исходными файлами, по аналогии с __pycache__
+CACHE_DIR_NAME = '__cortexcache__'
+
+
+class CompileCache:
+    """LRU-кэш: хранит не больше max_entries последних результатов компиляции"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def key(code, kind=''):
+        """Ключ кэша для текста программы; kind разделяет виды результата (например, 'cortex')"""
+        return hashlib.sha1(f"{kind}\0{code}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Результат компиляции по ключу или None"""
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class DiskCache:
+    """Кэш скомпилированных файлов на диске.
+
+    Для файла dir/name.cortex результат хранится в dir/__cortexcache__/name.cortex.<version>.pickle
+    вместе с ключом исходного текста. Смена версии компилятора меняет имя файла
+    кэша, изменение исходника - ключ, и в обоих случаях старая запись не читается.
+    Файлы кэша других версий для того же исходника удаляются при записи.
+    """
+
+    def __init__(self, version):
+        self.version = version
+
+    def path(self, source_path):
+        """Файл кэша; имя исходника берется с расширением: a.cortex и a.txt не смешиваются"""
+        directory, name = os.path.split(os.path.abspath(source_path))
+        return os.path.join(directory, CACHE_DIR_NAME, f"{name}.{self.version}.pickle")
+
+    def load(self, source_path, key):
+        """Сохраненный результат компиляции для ключа исходного текста или None"""
+        try:
+            with open(self.path(source_path), 'rb') as file:
+                version, stored_key, data = pickle.load(file)
+        except Exception:
+            # Нет файла, нет доступа или файл поврежден - просто компилируем заново
+            return None
+        if version != self.version or stored_key != key:
+            return None
+        return data
+
+    def store(self, source_path, key, data):
+        """Сохраняет результат компиляции. Ошибки записи игнорируются, как для __pycache__"""
+        path = self.path(source_path)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                pickle.dump((self.version, key, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+            # Запись через временный файл: параллельный запуск не прочитает недописанный кэш
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self.remove_stale(source_path)
+
+    def remove_stale(self, source_path):
+        """Удаляет файлы кэша исходника, записанные другими версиями компилятора"""
+        directory, current = os.path.split(self.path(source_path))
+        prefix = f"{os.path.basename(source_path)}."
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for other in names:
+            # name.<версия>.pickle: версия - хэш без точек, так что name.txt.<версия>.pickle не задевается
+            version = other[len(prefix):-len('.pickle')]
+            if other != current and other.startswith(prefix) and other.endswith('.pickle') \
+                    and version and '.' not in version:
+                try:
+                    os.remove(os.path.join(directory, other))
+                except OSError:
+                    pass
+
+
+# Общий кэш процесса
+compile_cache = CompileCache()
@@ -0,0 +1,252 @@
+# Выполнение программ Cortex в отдельном процессе.
+# Постоянный процесс компилятора (serve) запускает CompilerService из main_window,
+# сообщения для окна вывода и отладки передаются через очередь multiprocessing
+# обычными данными, поэтому дочернему процессу не нужен графический интерфейс.
+
+import os
+import sys
+import pickle
+import hashlib
+import traceback
+
+from compile_cache import CompileCache, DiskCache
+
+# Виды сообщений в очереди. Сообщение - кортеж (вид, текст)
+MESSAGE = 'message'  # Служебное сообщение IDE
+OUTPUT = 'output'    # Вывод программы
+ERROR = 'error'      # Ошибка компиляции или выполнения
+DEBUG = 'debug'      # Вместо текста - пара (заголовок, токены или AST в виде debug_data)
+COMPILED = 'compiled'  # Вместо текста - pickle пары (токены, AST) для кэша компиляции
+DONE = 'done'        # Выполнение завершено, последнее сообщение процесса
+
+# В отладочных данных (debug_data): описание объекта - имя класса или текст токена
+CLASS_KEY = '__class__'
+
+# Уровни отладочного вывода
+VERBOSITY_QUIET = 0   # Только вывод программы и ошибки
+VERBOSITY_STAGES = 1  # Плюс этапы компиляции
+VERBOSITY_DEBUG = 2   # Плюс токены и AST для панели отладки
+
+# Каталог, из которого импортируется пакет cortex.compiler
+COMPILER_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Версия загруженного компилятора, None - компилятор еще не загружен (см. load_compiler)
+_compiler_version = None
+
+
+def add_compiler_path():
+    """Добавляет путь к компилятору в sys.path, если его там еще нет"""
+    if COMPILER_PATH not in sys.path:
+        sys.path.append(COMPILER_PATH)
+
+
+class QueueWriter:
+    """Файлоподобный объект: построчно отправляет вывод программы в очередь"""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.buffer = ''
+
+    def write(self, text):
+        self.buffer += text
+        if '\n' in self.buffer:
+            lines, self.buffer = self.buffer.rsplit('\n', 1)
+            self.queue.put((OUTPUT, lines))
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            self.queue.put((OUTPUT, self.buffer))
+            self.buffer = ''
+
+
+def compiler_version():
+    """Версия компилятора для кэша на диске: хэш исходников пакета cortex.compiler.
+
+    Любое изменение лексера, парсера или классов AST дает новую версию, и старый
+    кэш перестает использоваться.
+    """
+    import cortex.compiler as package
+
+    digest = hashlib.sha1(str(getattr(package, '__version__', '')).encode('utf-8'))
+    directory = os.path.dirname(package.__file__)
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            with open(os.path.join(directory, name), 'rb') as file:
+                digest.update(name.encode('utf-8'))
+                digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def load_compiler():
+    """Импортирует компилятор Cortex и возвращает его версию. Повторные вызовы ничего не делают"""
+    global _compiler_version
+    if _compiler_version is None:
+        add_compiler_path()
+        import cortex.compiler.lexer
+        import cortex.compiler.parser
+        import cortex.compiler.interpreter
+        _compiler_version = compiler_version()
+    return _compiler_version
+
+
+def debug_data(value, active=None):
+    """Токены или AST в виде простых данных: кортежей, словарей, строк и чисел.
+
+    Объект становится словарем его полей с описанием под ключом CLASS_KEY,
+    поэтому процессу IDE для панели отладки не нужны классы компилятора.
+    active - объекты на пути от корня, для обрыва циклических ссылок.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if active is None:
+        active = set()
+    if id(value) in active:
+        return '<циклическая ссылка>'
+    active.add(id(value))
+    try:
+        if isinstance(value, (list, tuple)):
+            return tuple(debug_data(item, active) for item in value)
+        if isinstance(value, dict):
+            return {str(key): debug_data(item, active) for key, item in value.items()}
+        if hasattr(value, '__dict__') and not isinstance(value, type):
+            if hasattr(value, 'type') and hasattr(value, 'value'):
+                # Токен лексера
+                description = f"{value.type} = '{value.value}'"
+            else:
+                description = type(value).__name__
+            data = {CLASS_KEY: description}
+            for name, item in vars(value).items():
+                if not name.startswith('_'):
+                    data[name] = debug_data(item, active)
+            return data
+        return repr(value)
+    finally:
+        active.discard(id(value))
+
+
+def send_debug(queue, title, value):
+    """Отправляет токены или AST в панель отладки"""
+    try:
+        queue.put((DEBUG, (title, debug_data(value))))
+    except Exception as e:
+        queue.put((MESSAGE, f"⚠️ {title}: отладочный вывод недоступен ({e})"))
+
+
+def run_program(code, queue, verbosity=VERBOSITY_STAGES, compiled=None, source_path=None):
+    """Точка входа процесса: лексический и синтаксический анализ, интерпретация.
+
+    compiled - результат прошлой компиляции этого же текста из сообщения COMPILED,
+    с ним лексический и синтаксический анализ пропускаются. source_path - файл,
+    текст которого выполняется: результат компиляции ищется и сохраняется
+    в кэше на диске рядом с ним.
+    """
+    def send(text):
+        queue.put((MESSAGE, text))
+
+    def stage(text):
+        if verbosity >= VERBOSITY_STAGES:
+            send(text)
+
+    # print внутри интерпретатора попадает в окно вывода по мере выполнения
+    writer = QueueWriter(queue)
+    stdout = sys.stdout
+    sys.stdout = writer
+
+    try:
+        # Компилятор импортируется при первом запуске в процессе, дальше берется из sys.modules
+        version = load_compiler()
+        from cortex.compiler.lexer import Lexer
+        from cortex.compiler.parser import Parser
+        from cortex.compiler.interpreter import Interpreter
+
+        # Токены и AST для отладки форматируются в панели отладки по мере раскрытия
+        debug = verbosity >= VERBOSITY_DEBUG
+
+        disk_cache = key = None
+        if compiled is None and source_path:
+            disk_cache = DiskCache(version)
+            key = CompileCache.key(code, 'cortex')
+            compiled = disk_cache.load(source_path, key)
+            if compiled is not None:
+                # Из кэша на диске - и в кэш IDE для следующих запусков
+                queue.put((COMPILED, compiled))
+
+        if compiled is not None:
+            stage("⚡ Программа не изменилась, компиляция пропущена")
+            tokens, ast = pickle.loads(compiled)
+            if debug:
+                send_debug(queue, f"Токены ({len(tokens)})", tokens)
+        else:
+            # Лексический анализ
+            stage("🔍 Лексический анализ...")
+            lexer = Lexer(code)
+            tokens = lexer.tokenize()
+            if debug:
+                send_debug(queue, f"Токены ({len(tokens)})", tokens)
+
+            # Синтаксический анализ
+            stage("🔍 Синтаксический анализ...")
+            parser = Parser(tokens)
+            ast = parser.parse()
+
+            # Результат компиляции возвращается в IDE для повторных запусков
+            try:
+                compiled = pickle.dumps((tokens, ast))
+            except Exception:
+                compiled = None
+            if compiled is not None:
+                queue.put((COMPILED, compiled))
+                if disk_cache is not None:
+                    disk_cache.store(source_path, key, compiled)
+
+        if debug:
+            send_debug(queue, "AST", ast)
+
+        # Интерпретация
+        stage("🔍 Интерпретация...")
+        interpreter = Interpreter()
+        result = interpreter.interpret(ast)
+        writer.flush()
+
+        # Вывод результатов
+        output_text = interpreter.get_output()
+        if output_text:
+            send("📤 Вывод программы:")
+            queue.put((OUTPUT, output_text))
+        else:
+            send("ℹ️ Программа не вывела данных")
+
+        if result is not None:
+            send(f"📤 Возвращаемое значение: {result}")
+
+        send("✅ Выполнение завершено")
+
+    except Exception as e:
+        writer.flush()
+        queue.put((ERROR, f"❌ Ошибка выполнения: {str(e)}"))
+        queue.put((ERROR, f"❌ Трассировка: {traceback.format_exc()}"))
+
+    finally:
+        sys.stdout = stdout
+        queue.put((DONE, ''))
+
+
+def serve(tasks, queue):
+    """Точка входа постоянного процесса компилятора.
+
+    Компилятор импортируется сразу, до первого задания. Задания - кортежи
+    (code, verbosity, compiled, source_path) из очереди tasks, None завершает процесс.
+    """
+    try:
+        load_compiler()
+    except Exception:
+        # Ошибка импорта будет выведена при запуске программы
+        pass
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        code, *options = task
+        run_program(code, queue, *options)
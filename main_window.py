@@ -1,12 +1,59 @@
+import time
+
+# Начало импорта модуля, для профиля запуска (--profile-startup)
+IMPORT_STARTED = time.perf_counter()
+
 import sys
 import os
-import traceback
+import queue
+import multiprocessing
+from contextlib import contextmanager
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QTabWidget, QPlainTextEdit,
                              QMenuBar, QStatusBar, QMessageBox, QFileDialog,
-                             QDockWidget, QTextEdit)
-from PyQt6.QtGui import QAction, QFont, QColor, QPainter, QTextFormat
-from PyQt6.QtCore import Qt, QRect, QSize
+                             QDockWidget, QTextEdit, QTreeView)
+from PyQt6.QtGui import QAction, QActionGroup, QFont, QColor, QPainter, QTextFormat, QTextCharFormat, QTextCursor
+from PyQt6.QtCore import Qt, QRect, QSize, QObject, QTimer, pyqtSignal, QAbstractItemModel, QModelIndex
+
+from cortex_worker import (serve, ERROR, DEBUG, COMPILED, DONE, CLASS_KEY,
+                           VERBOSITY_QUIET, VERBOSITY_STAGES, VERBOSITY_DEBUG)
+from compile_cache import CompileCache, compile_cache
+
+IMPORT_TIME = time.perf_counter() - IMPORT_STARTED
+
+
+class StartupProfile:
+    """Время создания компонентов IDE при запуске (флаг --profile-startup)"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.records = [("Импорт main_window (PyQt6, cortex_worker)", IMPORT_TIME)]
+        self.reported = False
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append((name, time.perf_counter() - start))
+            # Компоненты, созданные после отчета (отложенные), выводятся сразу
+            if self.enabled and self.reported:
+                self.print_record(*self.records[-1])
+
+    def print_record(self, name, seconds):
+        print(f"{name:<45} {seconds * 1000:8.1f} мс", file=sys.stderr)
+
+    def report(self, total=None):
+        """Выводит замеры в stderr"""
+        if not self.enabled:
+            return
+        print("Профиль запуска:", file=sys.stderr)
+        for name, seconds in self.records:
+            self.print_record(name, seconds)
+        if total is not None:
+            self.print_record("Всего до первого цикла событий", total)
+        self.reported = True
 
 
 class LineNumberArea(QWidget):
@@ -26,6 +73,10 @@ class CodeEditor(QPlainTextEdit):
         super().__init__()
         self.line_number_area = LineNumberArea(self)
 
+        # Ключ кэша компиляции для ревизии документа, при которой он был вычислен
+        self.compiled_revision = None
+        self.compiled_key = None
+
         # Настройки редактора
         self.setFont(QFont("Consolas", 11))
         self.setTabStopDistance(20)  # Ширина табуляции
@@ -106,38 +157,391 @@ class CodeEditor(QPlainTextEdit):
 
 
 class OutputWindow(QTextEdit):
-    def __init__(self):
+    """Окно вывода с буферизацией.
+
+    append_message только добавляет сообщение в буфер, а документ обновляется
+    по таймеру раз в FLUSH_INTERVAL: подряд идущие сообщения одного цвета
+    вставляются одной операцией. Старые строки сверх max_blocks удаляются.
+    """
+
+    FLUSH_INTERVAL = 50  # мс
+    MAX_BLOCKS = 10000  # Ограничение прокрутки по умолчанию, строк
+
+    def __init__(self, max_blocks=MAX_BLOCKS):
         super().__init__()
         self.setReadOnly(True)
         self.setFont(QFont("Consolas", 10))
 
+        self.pending = []  # Сообщения (текст, цвет), еще не выведенные в документ
+        self.pending_lines = 0
+        self.max_blocks = 0
+        self.set_max_blocks(max_blocks)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def set_max_blocks(self, count):
+        """Максимальное число строк в окне, 0 - без ограничения"""
+        self.max_blocks = count
+        self.document().setMaximumBlockCount(count)
+
     def append_message(self, message, color=None):
-        if color:
-            self.setTextColor(color)
-        else:
-            self.setTextColor(QColor(0, 0, 0))  # Черный по умолчанию
+        self.pending.append((message, color))
+        self.pending_lines += message.count('\n') + 1
+        if not self.flush_timer.isActive():
+            self.flush_timer.start(self.FLUSH_INTERVAL)
+
+    def flush(self):
+        """Выводит накопленные сообщения в документ"""
+        pending = self.pending
+        if not pending:
+            return
+        self.pending = []
+
+        # Сообщения, которые сразу же будут обрезаны ограничением прокрутки, не вставляем
+        if self.max_blocks and self.pending_lines > self.max_blocks:
+            lines = 0
+            start = len(pending)
+            while start > 0 and lines < self.max_blocks:
+                start -= 1
+                lines += pending[start][0].count('\n') + 1
+            pending = pending[start:]
+        self.pending_lines = 0
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        first = self.document().isEmpty()
+
+        # Подряд идущие сообщения одного цвета вставляются одной строкой
+        start = 0
+        while start < len(pending):
+            color = pending[start][1]
+            end = start + 1
+            while end < len(pending) and pending[end][1] == color:
+                end += 1
+
+            text = '\n'.join(message for message, _ in pending[start:end])
+            char_format = QTextCharFormat()
+            char_format.setForeground(color or QColor(0, 0, 0))  # Черный по умолчанию
+            cursor.insertText(text if first else '\n' + text, char_format)
+
+            first = False
+            start = end
+
+        cursor.endEditBlock()
 
-        self.append(message)
         # Прокручиваем к последнему сообщению
-        cursor = self.textCursor()
-        cursor.movePosition(cursor.MoveOperation.End)
         self.setTextCursor(cursor)
 
+    def clear(self):
+        """Очищает окно вместе с еще не выведенными сообщениями"""
+        self.pending = []
+        self.pending_lines = 0
+        super().clear()
+
+
+class DebugNode:
+    """Узел дерева отладки. Дочерние узлы и текст создаются при первом обращении"""
+    __slots__ = ('label', 'value', 'parent', 'row', 'children_cache', 'text_cache')
+
+    MAX_TEXT = 200  # Длина текста значения в дереве, символов
+
+    def __init__(self, label, value, parent=None, row=0):
+        self.label = label
+        self.value = value
+        self.parent = parent
+        self.row = row
+        self.children_cache = None
+        self.text_cache = None
+
+    @staticmethod
+    def items(value):
+        """Пары (подпись, значение) для дочерних узлов значения"""
+        if isinstance(value, (list, tuple)):
+            return [(str(i), item) for i, item in enumerate(value)]
+        if isinstance(value, dict):
+            return [(key, item) for key, item in value.items() if key != CLASS_KEY]
+        return []
+
+    def has_children(self):
+        if self.children_cache is not None:
+            return bool(self.children_cache)
+        value = self.value
+        if isinstance(value, dict):
+            return any(key != CLASS_KEY for key in value)
+        return isinstance(value, (list, tuple)) and bool(value)
+
+    def children(self):
+        if self.children_cache is None:
+            self.children_cache = [DebugNode(label, value, self, row)
+                                   for row, (label, value) in enumerate(self.items(self.value))]
+        return self.children_cache
+
+    def text(self):
+        if self.text_cache is None:
+            value = self.value
+            if isinstance(value, dict) and CLASS_KEY in value:
+                # Объект компилятора: имя класса или текст токена
+                summary = value[CLASS_KEY]
+            elif isinstance(value, (list, tuple, dict)):
+                summary = f"{type(value).__name__} [{len(value)}]"
+            else:
+                summary = repr(value)
+            if len(summary) > self.MAX_TEXT:
+                summary = summary[:self.MAX_TEXT] + '...'
+            self.text_cache = f"{self.label}: {summary}" if self.label else summary
+        return self.text_cache
+
+
+class DebugTreeModel(QAbstractItemModel):
+    """Дерево токенов и AST. Узлы форматируются только при раскрытии в QTreeView"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = DebugNode('', [])
+        self.root.children_cache = []
+
+    def clear(self):
+        self.beginResetModel()
+        self.root.children_cache = []
+        self.endResetModel()
+
+    def add_root(self, label, value):
+        """Добавляет верхний узел (например, список токенов)"""
+        children = self.root.children_cache
+        self.beginInsertRows(QModelIndex(), len(children), len(children))
+        children.append(DebugNode(label, value, self.root, len(children)))
+        self.endInsertRows()
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self.node(parent).children()
+        if column != 0 or not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, 0, children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def hasChildren(self, parent=QModelIndex()):
+        return self.node(parent).has_children()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children())
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role == Qt.ItemDataRole.DisplayRole:
+            return index.internalPointer().text()
+        return None
+
+
+class CompilerService(QObject):
+    """Постоянный процесс компилятора Cortex (см. cortex_worker.serve).
+
+    Процесс запускается заранее (warm_up) и один раз импортирует компилятор,
+    поэтому запуск программы не ждет старта интерпретатора Python и импортов.
+    Сообщения процесса читаются из очереди по таймеру и передаются сигналом
+    message, интерфейс не блокируется. stop() завершает процесс вместе с
+    выполняющейся программой (если он не завершился за STOP_TIMEOUT - убивает),
+    после чего в фоне запускается новый. Завершения процесса интерфейс не
+    ждет: за остановленными процессами по таймеру следит reap.
+    """
+    message = pyqtSignal(str, str)  # Вид сообщения, текст
+    debug = pyqtSignal(str, object)  # Заголовок, токены или AST (cortex_worker.debug_data)
+    finished = pyqtSignal()
+
+    POLL_INTERVAL = 30  # Период чтения очереди, мс
+    MAX_MESSAGES_PER_POLL = 1000  # Остальные сообщения дочитываются на следующем тике
+    STOP_TIMEOUT = 2.0  # Время на завершение процесса после terminate, с
+    REAP_INTERVAL = 50  # Период проверки завершаемых процессов, мс
+
+    def __init__(self, parent=None, cache=compile_cache):
+        super().__init__(parent)
+        # spawn вместо fork: дочерний процесс не наследует состояние Qt
+        self.context = multiprocessing.get_context('spawn')
+        self.process = None
+        self.tasks = None  # Очередь заданий процессу
+        self.queue = None  # Очередь сообщений от процесса
+        self.busy = False
+        self.cache = cache
+        self.cache_key = None
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+
+        # Завершаемые процессы: [процесс, очереди, срок до kill, kill уже вызван]
+        self.stopping = []
+        self.reaper = QTimer(self)
+        self.reaper.timeout.connect(self.reap)
+
+    @property
+    def running(self):
+        return self.busy
+
+    def warm_up(self):
+        """Запускает процесс компилятора, если он еще не запущен"""
+        if self.process is not None and self.process.is_alive():
+            return
+
+        self.kill()
+        self.tasks = self.context.Queue()
+        self.queue = self.context.Queue()
+        self.process = self.context.Process(target=serve, args=(self.tasks, self.queue), daemon=True)
+        self.process.start()
+
+    def start(self, code, verbosity=VERBOSITY_STAGES, cache_key=None, source_path=None):
+        """Запускает программу. Возвращает False, если предыдущая еще выполняется.
+
+        Если для cache_key в кэше есть результат компиляции, процесс сразу
+        переходит к интерпретации. source_path - сохраненный файл с этим текстом
+        для кэша компиляции на диске.
+        """
+        if self.busy:
+            return False
+
+        self.cache_key = cache_key or CompileCache.key(code, 'cortex')
+        compiled = self.cache.get(self.cache_key)
+
+        self.warm_up()
+        self.tasks.put((code, verbosity, compiled, source_path))
+        self.busy = True
+        self.timer.start(self.POLL_INTERVAL)
+        return True
+
+    def poll(self):
+        """Передает накопившиеся сообщения процесса"""
+        # Состояние процесса проверяем до чтения: все, что он успел отправить, уже в очереди
+        alive = self.process.is_alive()
+
+        for _ in range(self.MAX_MESSAGES_PER_POLL):
+            try:
+                kind, text = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == DONE:
+                self.finish()
+                return
+            if kind == COMPILED:
+                self.cache.put(self.cache_key, text)
+            elif kind == DEBUG:
+                self.debug.emit(*text)
+            else:
+                self.message.emit(kind, text)
+        else:
+            return
+
+        if not alive:
+            self.message.emit(ERROR, f"❌ Процесс выполнения аварийно завершился (код {self.process.exitcode})")
+            self.restart()
+
+    def stop(self):
+        """Принудительно останавливает выполнение"""
+        if not self.busy:
+            return
+
+        self.message.emit(ERROR, "⏹ Выполнение остановлено")
+        self.restart()
+
+    def restart(self):
+        """Завершает процесс с текущей программой и в фоне готовит новый"""
+        self.kill()
+        self.finish()
+        # Новый процесс запускается после того, как интерфейс обработает остановку
+        QTimer.singleShot(0, self.warm_up)
+
+    def kill(self, force=False):
+        """Завершает процесс компилятора, не дожидаясь его остановки.
+
+        Процесс получает terminate (force - сразу kill), дальше за ним следит reap.
+        """
+        if self.process is None:
+            return
+
+        if force:
+            self.process.kill()
+        else:
+            self.process.terminate()
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        self.stopping.append([self.process, (self.tasks, self.queue), deadline, force])
+        self.process = self.tasks = self.queue = None
+        if not self.reaper.isActive():
+            self.reaper.start(self.REAP_INTERVAL)
+
+    def reap(self):
+        """Убивает процессы, не завершившиеся за STOP_TIMEOUT, и закрывает очереди завершившихся"""
+        now = time.monotonic()
+        for entry in list(self.stopping):
+            process, queues, deadline, killed = entry
+            if process.is_alive():
+                if not killed and now > deadline:
+                    process.kill()
+                    entry[3] = True
+                continue
+            # Процесс уже завершился: join не ждет, а только освобождает его ресурсы
+            process.join()
+            for message_queue in queues:
+                message_queue.close()
+            self.stopping.remove(entry)
+        if not self.stopping:
+            self.reaper.stop()
+
+    def shutdown(self):
+        """Останавливает выполнение и процесс компилятора при закрытии IDE"""
+        self.timer.stop()
+        self.busy = False
+        # IDE закрывается и ждать процесс некому - убиваем сразу
+        self.kill(force=True)
+
+    def finish(self):
+        self.timer.stop()
+        self.busy = False
+        self.finished.emit()
+
 
 class ModernMainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
         self.setWindowTitle("Cortex IDE")
         self.setGeometry(100, 100, 1200, 800)
+        self.profile = profile or StartupProfile()
 
         # Словарь для хранения путей к файлам
         self.file_paths = {}
 
+        # Выполнение программ в отдельном процессе
+        self.verbosity = VERBOSITY_STAGES
+        self.compiler_service = CompilerService(self)
+        self.compiler_service.message.connect(self.show_run_message)
+        self.compiler_service.debug.connect(self.show_debug_dump)
+        self.compiler_service.finished.connect(self.run_finished)
+
+        # Панель отладки создается при первом отладочном запуске
+        self.debug_dock = None
+        self.debug_model = None
+
+        # Вкладка Робота создается при первом открытии (см. open_robot_tab)
+        self.robot_tab = None
+
         # Инициализация UI
         self.init_ui()
 
         # Создаем первую вкладку
-        self.create_new_tab()
+        with self.profile.measure("Первая вкладка редактора"):
+            self.create_new_tab()
 
     def init_ui(self):
         """Инициализация пользовательского интерфейса"""
@@ -151,19 +555,23 @@ class ModernMainWindow(QMainWindow):
         main_layout.setSpacing(0)
 
         # Создаем виджет вкладок
-        self.tab_widget = QTabWidget()
-        self.tab_widget.setTabsClosable(True)
-        self.tab_widget.tabCloseRequested.connect(self.close_tab)
-        main_layout.addWidget(self.tab_widget)
+        with self.profile.measure("Виджет вкладок"):
+            self.tab_widget = QTabWidget()
+            self.tab_widget.setTabsClosable(True)
+            self.tab_widget.tabCloseRequested.connect(self.close_tab)
+            main_layout.addWidget(self.tab_widget)
 
         # Создаем док-виджет для вывода
-        self.create_output_dock()
+        with self.profile.measure("Окно вывода"):
+            self.create_output_dock()
 
         # Применяем светлую тему
-        self.apply_light_theme()
+        with self.profile.measure("Светлая тема (таблица стилей)"):
+            self.apply_light_theme()
 
         # Создаем меню
-        self.create_menus()
+        with self.profile.measure("Меню"):
+            self.create_menus()
 
         # Создаем строку состояния
         self.create_status_bar()
@@ -281,16 +689,43 @@ class ModernMainWindow(QMainWindow):
         # Меню Выполнение
         run_menu = menubar.addMenu("Выполнение")
 
-        run_action = QAction("Запуск", self)
-        run_action.setShortcut("F5")
-        run_action.triggered.connect(self.run_code)
-        run_menu.addAction(run_action)
+        self.run_action = QAction("Запуск", self)
+        self.run_action.setShortcut("F5")
+        self.run_action.triggered.connect(self.run_code)
+        run_menu.addAction(self.run_action)
+
+        self.stop_action = QAction("Остановить", self)
+        self.stop_action.setShortcut("Shift+F5")
+        self.stop_action.setEnabled(False)
+        self.stop_action.triggered.connect(self.stop_code)
+        run_menu.addAction(self.stop_action)
+
+        # Уровень отладочного вывода
+        verbosity_menu = run_menu.addMenu("Отладочный вывод")
+        verbosity_group = QActionGroup(self)
+        for title, level in (("Нет", VERBOSITY_QUIET),
+                             ("Этапы компиляции", VERBOSITY_STAGES),
+                             ("Токены и AST", VERBOSITY_DEBUG)):
+            action = QAction(title, self)
+            action.setCheckable(True)
+            action.setChecked(level == self.verbosity)
+            action.triggered.connect(lambda checked, level=level: self.set_verbosity(level))
+            verbosity_group.addAction(action)
+            verbosity_menu.addAction(action)
 
         clear_output_action = QAction("Очистить вывод", self)
         clear_output_action.setShortcut("Ctrl+L")
         clear_output_action.triggered.connect(self.clear_output)
         run_menu.addAction(clear_output_action)
 
+        # Меню Инструменты
+        tools_menu = menubar.addMenu("Инструменты")
+
+        robot_action = QAction("Исполнитель Робот", self)
+        robot_action.setShortcut("Ctrl+R")
+        robot_action.triggered.connect(self.open_robot_tab)
+        tools_menu.addAction(robot_action)
+
         file_menu.addSeparator()
 
         exit_action = QAction("Выход", self)
@@ -312,9 +747,29 @@ class ModernMainWindow(QMainWindow):
         self.tab_widget.setCurrentIndex(index)
         self.file_paths[index] = None
 
+    def open_robot_tab(self):
+        """Открытие вкладки исполнителя Робота.
+
+        Модуль robot_executor импортируется, а пустая вкладка создается при первом
+        открытии; исполнитель с полем строится при первом показе вкладки
+        (RobotExecutorTab.showEvent). Закрытая вкладка сохраняется и открывается
+        снова с тем же полем.
+        """
+        if self.robot_tab is None:
+            with self.profile.measure("Вкладка Робота (импорт и пустая вкладка)"):
+                from robot_executor import RobotExecutorTab
+                self.robot_tab = RobotExecutorTab()
+
+        index = self.tab_widget.indexOf(self.robot_tab)
+        if index < 0:
+            index = self.tab_widget.addTab(self.robot_tab, "Робот")
+            self.file_paths[index] = None
+        self.tab_widget.setCurrentIndex(index)
+
     def close_tab(self, index):
         """Закрытие вкладки"""
-        if self.tab_widget.widget(index).document().isModified():
+        widget = self.tab_widget.widget(index)
+        if isinstance(widget, CodeEditor) and widget.document().isModified():
             reply = QMessageBox.question(self, "Подтверждение",
                                          "Сохранить изменения перед закрытием?",
                                          QMessageBox.StandardButton.Yes |
@@ -360,6 +815,8 @@ class ModernMainWindow(QMainWindow):
         """Сохранение файла"""
         if index is None:
             index = self.tab_widget.currentIndex()
+        if not isinstance(self.tab_widget.widget(index), CodeEditor):
+            return False
 
         if self.file_paths.get(index) is None:
             return self.save_file_as(index)
@@ -383,6 +840,8 @@ class ModernMainWindow(QMainWindow):
         """Сохранение файла как"""
         if index is None:
             index = self.tab_widget.currentIndex()
+        if not isinstance(self.tab_widget.widget(index), CodeEditor):
+            return False
 
         file_path, _ = QFileDialog.getSaveFileName(self, "Сохранить файл", "", "Cortex Files (*.cortex);;All Files (*)")
         if file_path:
@@ -411,7 +870,11 @@ class ModernMainWindow(QMainWindow):
     def run_code(self):
         """Запуск кода Cortex"""
         editor = self.tab_widget.currentWidget()
-        if editor:
+        if isinstance(editor, CodeEditor):
+            if self.compiler_service.running:
+                self.output_window.append_message("⚠️ Программа уже выполняется")
+                return
+
             code = editor.toPlainText()
             self.output_window.append_message("🚀 Запуск программы Cortex...")
 
@@ -419,61 +882,72 @@ class ModernMainWindow(QMainWindow):
                 self.output_window.append_message("⚠️ Нет кода для выполнения")
                 return
 
-            try:
-                # Добавляем путь для импорта модулей компилятора
-                sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-                # Импортируем компоненты компилятора
-                from cortex.compiler.lexer import Lexer
-                from cortex.compiler.parser import Parser
-                from cortex.compiler.interpreter import Interpreter
-
-                # Лексический анализ
-                self.output_window.append_message("🔍 Лексический анализ...")
-                lexer = Lexer(code)
-                tokens = lexer.tokenize()
-
-                # Выводим токены для отладки
-                self.output_window.append_message("📋 Токены:")
-                for i, token in enumerate(tokens):
-                    self.output_window.append_message(f"  {i}: {token.type} = '{token.value}'")
-
-                # Синтаксический анализ
-                self.output_window.append_message("🔍 Синтаксический анализ...")
-                parser = Parser(tokens)
-                ast = parser.parse()
-
-                # Выводим AST для отладки
-                self.output_window.append_message("📋 AST:")
-                self.output_window.append_message(f"  Тип: {type(ast)}")
-                if isinstance(ast, list):
-                    self.output_window.append_message(f"  Количество statements: {len(ast)}")
-                    for i, node in enumerate(ast):
-                        self.output_window.append_message(f"    {i}: {node}")
-                else:
-                    self.output_window.append_message(f"  Значение: {ast}")
-
-                # Интерпретация
-                self.output_window.append_message("🔍 Интерпретация...")
-                interpreter = Interpreter()
-                result = interpreter.interpret(ast)
-
-                # Вывод результатов
-                output_text = interpreter.get_output()
-                if output_text:
-                    self.output_window.append_message("📤 Вывод программы:")
-                    self.output_window.append_message(output_text)
-                else:
-                    self.output_window.append_message("ℹ️ Программа не вывела данных")
-
-                if result is not None:
-                    self.output_window.append_message(f"📤 Возвращаемое значение: {result}")
-
-                self.output_window.append_message("✅ Выполнение завершено")
+            if self.debug_model is not None:
+                self.debug_model.clear()
+
+            # Кэш на диске используется только для сохраненного файла без изменений
+            source_path = None
+            if not editor.document().isModified():
+                source_path = self.file_paths.get(self.tab_widget.currentIndex())
+
+            # Компиляция и интерпретация идут в отдельном процессе, вывод приходит в show_run_message
+            self.compiler_service.start(code, self.verbosity, self.compile_key(editor, code), source_path)
+            self.run_action.setEnabled(False)
+            self.stop_action.setEnabled(True)
+            self.status_bar.showMessage("Выполнение...")
+
+    def compile_key(self, editor, code):
+        """Ключ кэша компиляции вкладки. Пока документ не менялся, текст не хэшируется заново"""
+        revision = editor.document().revision()
+        if editor.compiled_revision != revision:
+            editor.compiled_revision = revision
+            editor.compiled_key = CompileCache.key(code, 'cortex')
+        return editor.compiled_key
+
+    def stop_code(self):
+        """Остановка выполняющейся программы"""
+        self.compiler_service.stop()
+
+    def show_run_message(self, kind, text):
+        self.output_window.append_message(text, QColor(200, 0, 0) if kind == ERROR else None)
+
+    def set_verbosity(self, level):
+        self.verbosity = level
+
+    def create_debug_dock(self):
+        """Создание панели отладки с деревом токенов и AST"""
+        self.debug_dock = QDockWidget("Отладка", self)
+        self.debug_model = DebugTreeModel(self)
+
+        view = QTreeView()
+        view.setHeaderHidden(True)
+        view.setUniformRowHeights(True)
+        view.setModel(self.debug_model)
+        self.debug_dock.setWidget(view)
+
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.debug_dock)
+
+    def show_debug_dump(self, title, value):
+        """Добавляет токены или AST из процесса выполнения в панель отладки"""
+        if self.debug_dock is None:
+            self.create_debug_dock()
+        self.debug_model.add_root(title, value)
+        self.debug_dock.show()
+
+    def run_finished(self):
+        self.run_action.setEnabled(True)
+        self.stop_action.setEnabled(False)
+        self.status_bar.showMessage("Готово")
 
-            except Exception as e:
-                self.output_window.append_message(f"❌ Ошибка выполнения: {str(e)}")
-                self.output_window.append_message(f"❌ Трассировка: {traceback.format_exc()}")
+    def showEvent(self, event):
+        """Процесс компилятора запускается в фоне, когда окно уже показано"""
+        super().showEvent(event)
+        QTimer.singleShot(0, self.compiler_service.warm_up)
+
+    def closeEvent(self, event):
+        """Выполняющаяся программа и процесс компилятора останавливаются при закрытии окна"""
+        self.compiler_service.shutdown()
+        super().closeEvent(event)
 
     def clear_output(self):
         """Очистка окна вывода"""
@@ -482,9 +956,21 @@ class ModernMainWindow(QMainWindow):
 
 
 def main():
-    app = QApplication(sys.argv)
-    window = ModernMainWindow()
-    window.show()
+    # --profile-startup: вывести в stderr время импорта и создания компонентов
+    argv = list(sys.argv)
+    profile = StartupProfile('--profile-startup' in argv)
+    if profile.enabled:
+        argv.remove('--profile-startup')
+
+    with profile.measure("QApplication"):
+        app = QApplication(argv)
+    with profile.measure("Главное окно"):
+        window = ModernMainWindow(profile)
+    with profile.measure("Показ окна"):
+        window.show()
+
+    # Отчет - когда цикл событий обработал показ окна
+    QTimer.singleShot(0, lambda: profile.report(time.perf_counter() - IMPORT_STARTED))
     sys.exit(app.exec())
 
 
@@ -0,0 +1,241 @@
+# Пакетная проверка программ Робота без запуска графического интерфейса.
+# Каждая программа (*.kum, *.robot) запускается на каждом поле (*.field),
+# результаты сохраняются в отчет JSON или CSV.
+#
+# Пример: python robot_batch.py submissions/ --fields tests/ --format csv --output report.csv --jobs 0
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from robot_field import parse_field, MARKED
+from robot_parser import parse_program
+from robot_compiler import compile_program
+from robot_machine import RobotMachine, ExecutionLimitError, InfiniteLoopError
+from robot_trace import ExecutionTrace
+
+PROGRAM_EXTENSIONS = ('.kum', '.robot')
+FIELD_EXTENSIONS = ('.field',)
+REPORT_COLUMNS = ['program', 'field', 'status', 'success', 'x', 'y', 'marked', 'steps', 'runtime', 'error']
+
+# Поля, загруженные в процесс-исполнитель при его запуске (см. init_worker)
+_worker_fields = []
+
+
+def find_files(directory, extensions):
+    """Файлы каталога с указанными расширениями, по алфавиту"""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(extensions) and os.path.isfile(os.path.join(directory, name)))
+
+
+def read_text(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def run_case(program, field, start, max_steps=None, time_limit=None, trace_path=None):
+    """Выполняет программу на копии поля и возвращает результат в виде словаря.
+
+    trace_path - файл, в который по ходу выполнения пишется трасса (robot_trace).
+
+    status: 'ok' - программа завершилась, 'error' - ошибка выполнения (робот
+    врезался в стену), 'loop' - программа зациклилась, 'limit' - превышен
+    лимит шагов или времени.
+    """
+    machine = RobotMachine(field.copy(), *start)
+    machine.load(program)
+    if trace_path is not None:
+        machine.start_trace(ExecutionTrace(trace_path))
+
+    status, error = 'ok', ''
+    started = time.perf_counter()
+    try:
+        machine.run(max_steps, time_limit)
+    except ExecutionLimitError as e:
+        status, error = 'limit', str(e)
+    except InfiniteLoopError as e:
+        status, error = 'loop', str(e)
+    except Exception as e:
+        status, error = 'error', str(e)
+    finally:
+        machine.stop_trace()
+    runtime = time.perf_counter() - started
+
+    return {
+        'status': status,
+        'success': status == 'ok',
+        'x': machine.x,
+        'y': machine.y,
+        'marked': sorted(machine.field.find_all(MARKED)),
+        'steps': machine.steps,
+        'runtime': round(runtime, 6),
+        'error': error,
+    }
+
+
+def failed_case(status, error):
+    """Результат для программы, которую не удалось запустить"""
+    return {'status': status, 'success': False, 'x': None, 'y': None, 'marked': None,
+            'steps': 0, 'runtime': 0.0, 'error': error}
+
+
+def load_fields(field_paths):
+    """Читает поля: список (имя файла, Field, стартовая клетка)"""
+    return [(os.path.basename(path), *parse_field(read_text(path))) for path in field_paths]
+
+
+def trace_path(trace_dir, program_name, field_name):
+    """Файл трассы запуска программы на поле, None - трассы не пишутся"""
+    if trace_dir is None:
+        return None
+    # Имя программы берется с расширением: a.kum и a.robot пишут разные трассы
+    return os.path.join(trace_dir, f"{program_name}.{os.path.splitext(field_name)[0]}.trace")
+
+
+def run_program(program_path, fields, max_steps=None, time_limit=None, trace_dir=None):
+    """Запускает одну программу на всех полях. Возвращает генератор записей отчета"""
+    name = os.path.basename(program_path)
+    # Программа компилируется один раз и переиспользуется для всех полей
+    try:
+        program = compile_program(parse_program(read_text(program_path)))
+    except Exception as e:
+        for field_name, _, _ in fields:
+            yield {'program': name, 'field': field_name, **failed_case('syntax', str(e))}
+        return
+
+    for field_name, field, start in fields:
+        result = run_case(program, field, start, max_steps, time_limit, trace_path(trace_dir, name, field_name))
+        yield {'program': name, 'field': field_name, **result}
+
+
+def run_batch(program_paths, field_paths, max_steps=None, time_limit=None, trace_dir=None):
+    """Запускает каждую программу на каждом поле. Возвращает генератор записей отчета"""
+    fields = load_fields(field_paths)
+    for program_path in program_paths:
+        yield from run_program(program_path, fields, max_steps, time_limit, trace_dir)
+
+
+def init_worker(field_paths):
+    """Инициализация процесса-исполнителя: поля читаются один раз на процесс"""
+    global _worker_fields
+    _worker_fields = load_fields(field_paths)
+
+
+def run_chunk(program_paths, max_steps, time_limit, trace_dir=None):
+    """Задача процесса-исполнителя: пачка программ на всех полях"""
+    records = []
+    for program_path in program_paths:
+        records.extend(run_program(program_path, _worker_fields, max_steps, time_limit, trace_dir))
+    return records
+
+
+def run_batch_parallel(program_paths, field_paths, max_steps=None, time_limit=None, jobs=None, chunk_size=8,
+                       trace_dir=None):
+    """Как run_batch, но программы распределяются по процессам пачками по chunk_size.
+
+    Одновременно в очереди держится не больше 2 * jobs пачек, записи отчета
+    возвращаются по мере готовности пачек, поэтому их порядок не определен.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    # Ошибки в файлах полей сообщаем сразу, а не из процессов-исполнителей
+    load_fields(field_paths)
+
+    chunks = (program_paths[i:i + chunk_size] for i in range(0, len(program_paths), chunk_size))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(field_paths,)) as pool:
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= 2 * jobs:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+            pending.add(pool.submit(run_chunk, chunk, max_steps, time_limit, trace_dir))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def write_json(records, output):
+    """Пишет отчет JSON по мере поступления записей, по записи на строку"""
+    output.write('[')
+    for index, record in enumerate(records):
+        output.write(',\n  ' if index else '\n  ')
+        output.write(json.dumps(record, ensure_ascii=False))
+    output.write('\n]\n')
+
+
+def format_cells(cells):
+    """Список клеток для ячейки CSV: "x,y;x,y" """
+    return ';'.join(f"{x},{y}" for x, y in cells)
+
+
+def write_csv(records, output):
+    writer = csv.DictWriter(output, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+    for record in records:
+        if record['marked'] is not None:
+            record = {**record, 'marked': format_cells(record['marked'])}
+        writer.writerow(record)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Пакетная проверка программ Робота")
+    parser.add_argument('programs', help="каталог с программами (*.kum, *.robot)")
+    parser.add_argument('--fields', help="каталог с полями (*.field), по умолчанию - каталог программ")
+    parser.add_argument('--format', choices=['json', 'csv'], default='json', help="формат отчета")
+    parser.add_argument('--output', help="файл отчета, по умолчанию - стандартный вывод")
+    parser.add_argument('--max-steps', type=int, default=1_000_000, help="лимит инструкций на запуск")
+    parser.add_argument('--time-limit', type=float, default=10.0, help="лимит времени на запуск, с")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="число процессов; 0 - по числу ядер, 1 - без пула процессов")
+    parser.add_argument('--chunk-size', type=int, default=8, help="программ в одной задаче процесса")
+    parser.add_argument('--trace', metavar='DIR',
+                        help="каталог для трасс выполнения (программа.поле.trace, см. robot_trace)")
+    return parser
+
+
+def main(argv=None):
+    """Точка входа. Код возврата 0 - все запуски успешны, 1 - есть неуспешные, 2 - ошибка аргументов"""
+    args = build_arg_parser().parse_args(argv)
+
+    program_paths = find_files(args.programs, PROGRAM_EXTENSIONS)
+    field_paths = find_files(args.fields or args.programs, FIELD_EXTENSIONS)
+    if not program_paths or not field_paths:
+        print("Не найдены программы или поля для проверки", file=sys.stderr)
+        return 2
+
+    if args.trace:
+        os.makedirs(args.trace, exist_ok=True)
+
+    if args.jobs == 1:
+        records = run_batch(program_paths, field_paths, args.max_steps, args.time_limit, args.trace)
+    else:
+        records = run_batch_parallel(program_paths, field_paths, args.max_steps, args.time_limit,
+                                     args.jobs or None, args.chunk_size, args.trace)
+
+    # Отчет пишется по мере готовности результатов, неуспешные запуски подсчитываются по пути
+    failed = []
+
+    def counted(records):
+        for record in records:
+            if not record['success']:
+                failed.append(record)
+            yield record
+
+    writer = write_csv if args.format == 'csv' else write_json
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            writer(counted(records), output)
+    else:
+        writer(counted(records), sys.stdout)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
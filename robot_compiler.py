@@ -0,0 +1,226 @@
+# Компилятор программ Робота в линейный байт-код.
+# AST из robot_parser превращается в массив инструкций
+# с условными и безусловными переходами и одним счетчиком команд.
+# Оптимизатор (optimize_code) сворачивает серии ходов и циклы "идти, пока свободно".
+
+from robot_parser import Move, Mark, While, DoWhile, For, If, Sensor, Not, And, ProgramError
+
+# Коды операций. Каждая инструкция - кортеж (op, a, b, c)
+OP_MOVE = 0             # a - направление (значение Direction)
+OP_MARK = 1             # закрасить клетку
+OP_JUMP = 2             # a - адрес перехода
+OP_JUMP_IF_FALSE = 3    # a - таблица истинности условия, b - адрес перехода
+OP_JUMP_IF_TRUE = 4     # a - таблица истинности условия, b - адрес перехода
+OP_FOR_INIT = 5         # a - счетчик, b - начальное значение
+OP_FOR_TEST_UP = 6      # a - счетчик, b - конечное значение, c - адрес выхода (счетчик > b)
+OP_FOR_TEST_DOWN = 7    # a - счетчик, b - конечное значение, c - адрес выхода (счетчик < b)
+OP_FOR_STEP = 8         # a - счетчик, b - шаг, c - адрес проверки
+# Составные инструкции оптимизатора, только в Program.fast_code
+OP_MOVE_N = 9           # a - направление, b - число ходов подряд
+OP_WALK = 10            # a - направление, b - таблица истинности условия, c - адрес выхода
+
+MOVE_NAMES = ('вверх', 'вправо', 'вниз', 'влево')
+DX = (0, 1, 0, -1)
+DY = (-1, 0, 1, 0)
+
+SIDE_NAMES = ('сверху', 'справа', 'снизу', 'слева')
+
+# Любое условие зависит только от 4-битной маски соседей клетки (Field.masks),
+# поэтому компилируется в 16-битную таблицу истинности: бит mask установлен,
+# если условие истинно при такой маске. Проверка - (table >> mask) & 1.
+ALL_MASKS = 0xFFFF
+
+
+def sensor_table(side, wall):
+    """Таблица истинности датчика 'сторона стена' (wall=True) или 'сторона свободно'"""
+    table = 0
+    for mask in range(16):
+        if bool(mask >> side & 1) == wall:
+            table |= 1 << mask
+    return table
+
+
+def condition_table(condition):
+    """Таблица истинности условия из AST"""
+    if isinstance(condition, Sensor):
+        return sensor_table(condition.side, condition.wall)
+    if isinstance(condition, Not):
+        return ~condition_table(condition.operand) & ALL_MASKS
+    if isinstance(condition, And):
+        return condition_table(condition.left) & condition_table(condition.right)
+    return condition_table(condition.left) | condition_table(condition.right)
+
+
+def condition_text(condition):
+    """Текст условия для панели информации"""
+    if isinstance(condition, Sensor):
+        return f"{SIDE_NAMES[condition.side]} {'стена' if condition.wall else 'свободно'}"
+    if isinstance(condition, Not):
+        return f"не {condition_text(condition.operand)}"
+    word = 'и' if isinstance(condition, And) else 'или'
+    return f"({condition_text(condition.left)} {word} {condition_text(condition.right)})"
+
+
+class Program:
+    """Скомпилированная программа. Не изменяется при выполнении.
+
+    fast_code - оптимизированный байт-код (см. optimize_code) с теми же адресами,
+    что и code; без оптимизации совпадает с code.
+    """
+    __slots__ = ('code', 'lines', 'counter_names', 'condition_names', 'fast_code')
+
+    def __init__(self, code, lines, counter_names, condition_names=None, fast_code=None):
+        self.code = tuple(code)
+        self.lines = tuple(lines)  # Номер строки исходного текста для каждой инструкции
+        self.counter_names = tuple(counter_names)
+        self.condition_names = dict(condition_names or {})  # Таблица истинности -> текст условия
+        self.fast_code = self.code if fast_code is None else tuple(fast_code)
+
+    def __len__(self):
+        return len(self.code)
+
+    def describe(self, pc):
+        """Текстовое описание инструкции для панели информации"""
+        op, a, b, c = self.code[pc]
+        if op == OP_MOVE:
+            return MOVE_NAMES[a]
+        if op == OP_MARK:
+            return 'закрасить'
+        if op == OP_JUMP:
+            return f'переход к {a}'
+        if op == OP_JUMP_IF_FALSE:
+            return f'если не {self.condition_names.get(a, a)} переход к {b}'
+        if op == OP_JUMP_IF_TRUE:
+            return f'если {self.condition_names.get(a, a)} переход к {b}'
+        if op == OP_FOR_INIT:
+            return f'{self.counter_names[a]} := {b}'
+        if op in (OP_FOR_TEST_UP, OP_FOR_TEST_DOWN):
+            return f'проверка {self.counter_names[a]} до {b}'
+        return f'{self.counter_names[a]} += {b}'
+
+
+class Compiler:
+    """Переводит AST в байт-код"""
+
+    def __init__(self):
+        self.code = []
+        self.lines = []
+        self.counter_names = []
+        self.condition_names = {}
+        self.line = 0  # Строка текущего компилируемого узла
+
+    def compile(self, nodes):
+        self.compile_block(nodes)
+        return Program(self.code, self.lines, self.counter_names, self.condition_names,
+                       optimize_code(self.code))
+
+    def emit(self, op, a=0, b=0, c=0):
+        self.code.append((op, a, b, c))
+        self.lines.append(self.line)
+        return len(self.code) - 1
+
+    def patch(self, address, op, a=0, b=0, c=0):
+        self.code[address] = (op, a, b, c)
+
+    def compile_block(self, nodes):
+        for node in nodes:
+            self.line = node.line
+            if isinstance(node, Move):
+                self.emit(OP_MOVE, node.direction)
+            elif isinstance(node, Mark):
+                self.emit(OP_MARK)
+            elif isinstance(node, While):
+                self.compile_while(node)
+            elif isinstance(node, DoWhile):
+                self.compile_do_while(node)
+            elif isinstance(node, For):
+                self.compile_for(node)
+            elif isinstance(node, If):
+                self.compile_if(node)
+            else:
+                raise ProgramError(node.line, "неизвестная команда")
+
+    def condition_code(self, condition):
+        table = condition_table(condition)
+        self.condition_names.setdefault(table, condition_text(condition))
+        return table
+
+    def compile_while(self, node):
+        # L: если не условие -> выход; тело; переход к L
+        start = self.emit(OP_JUMP_IF_FALSE)
+        self.compile_block(node.body)
+        self.line = node.line
+        self.emit(OP_JUMP, start)
+        self.patch(start, OP_JUMP_IF_FALSE, self.condition_code(node.condition), len(self.code))
+
+    def compile_do_while(self, node):
+        # L: тело; если условие -> L. Без условия тело выполняется один раз
+        start = len(self.code)
+        self.compile_block(node.body)
+        self.line = node.line
+        if node.condition is not None:
+            self.emit(OP_JUMP_IF_TRUE, self.condition_code(node.condition), start)
+
+    def compile_for(self, node):
+        if node.step == 0:
+            raise ProgramError(node.line, "шаг цикла 'для' не может быть равен 0")
+
+        counter = len(self.counter_names)
+        self.counter_names.append(node.var_name)
+        test_op = OP_FOR_TEST_UP if node.step > 0 else OP_FOR_TEST_DOWN
+
+        self.emit(OP_FOR_INIT, counter, node.start)
+        test = self.emit(test_op)
+        self.compile_block(node.body)
+        self.line = node.line
+        self.emit(OP_FOR_STEP, counter, node.step, test)
+        self.patch(test, test_op, counter, node.end, len(self.code))
+
+    def compile_if(self, node):
+        # если не условие -> иначе; то-ветка; переход к концу; иначе-ветка
+        condition = self.condition_code(node.condition)
+        branch = self.emit(OP_JUMP_IF_FALSE)
+        self.compile_block(node.then_body)
+        self.line = node.line
+        if node.else_body:
+            skip_else = self.emit(OP_JUMP)
+            self.patch(branch, OP_JUMP_IF_FALSE, condition, len(self.code))
+            self.compile_block(node.else_body)
+            self.patch(skip_else, OP_JUMP, len(self.code))
+        else:
+            self.patch(branch, OP_JUMP_IF_FALSE, condition, len(self.code))
+
+
+def optimize_code(code):
+    """Оптимизированная копия байт-кода с теми же адресами инструкций.
+
+    Серия одинаковых ходов сворачивается в OP_MOVE_N: инструкция на каждом
+    адресе серии заменяется ходом на оставшееся до конца серии число клеток,
+    поэтому переход в середину серии тоже работает. Цикл
+    "нц пока условие; ход; кц", в котором условие гарантирует, что в сторону
+    хода свободно, заменяется в заголовке на OP_WALK - проход до первой клетки,
+    где условие ложно. Остальные инструкции цикла остаются на своих адресах.
+    """
+    fast = list(code)
+    run = 0  # Длина серии одинаковых ходов, начинающейся со следующей инструкции
+    for pc in range(len(code) - 1, -1, -1):
+        op, a, b, c = code[pc]
+        if op != OP_MOVE:
+            run = 0
+            if (op == OP_JUMP_IF_FALSE and b == pc + 3 and code[pc + 1][0] == OP_MOVE
+                    and code[pc + 2] == (OP_JUMP, pc, 0, 0)):
+                direction = code[pc + 1][1]
+                # Условие истинно только при маске без стены в сторону хода - ход не может завершиться ошибкой
+                if a & sensor_table(direction, True) == 0:
+                    fast[pc] = (OP_WALK, direction, a, b)
+            continue
+
+        run = run + 1 if pc + 1 < len(code) and code[pc + 1] == code[pc] else 1
+        if run > 1:
+            fast[pc] = (OP_MOVE_N, a, run, 0)
+    return fast
+
+
+def compile_program(nodes):
+    """Компилирует AST из robot_parser.parse_program в Program"""
+    return Compiler().compile(nodes)
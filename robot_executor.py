@@ -1,14 +1,25 @@
 import sys
 import os
+import time
+import queue
+import threading
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QLabel, QSpinBox, QComboBox, QGridLayout, QGroupBox,
                              QMessageBox, QSplitter, QTextEdit, QApplication,
-                             QPlainTextEdit, QScrollArea, QFrame, QSizePolicy)
+                             QPlainTextEdit, QScrollArea, QFrame, QSizePolicy, QCheckBox, QFileDialog,
+                             QSlider)
 from PyQt6.QtGui import QPainter, QColor, QPen, QFont, QBrush, QPixmap, QIcon, QTextCursor, QSyntaxHighlighter, \
-    QTextCharFormat
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QSize, QPoint, QRegularExpression
+    QTextCharFormat, QTextBlockUserData
+from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal, QSize, QPoint, QRect
 from enum import Enum
 
+from robot_field import Field, WALL, MARKED
+from robot_parser import lex_line, highlight_spans, IncrementalParser, ProgramError
+from robot_compiler import compile_program
+from robot_machine import RobotMachine
+from robot_validator import ProgramValidator
+from robot_trace import ExecutionTrace
+
 
 class Direction(Enum):
     UP = 0
@@ -17,82 +28,227 @@ class Direction(Enum):
     LEFT = 3
 
 
-class CellType(Enum):
-    EMPTY = 0
-    WALL = 1
-    MARKED = 2
-    ROBOT = 3
+class LineTokens(QTextBlockUserData):
+    """Токены строки документа (robot_parser.lex_line), хранятся в самой строке QTextBlock"""
+
+    def __init__(self, text, tokens):
+        super().__init__()
+        self.text = text
+        self.tokens = tokens
+
+
+def block_line(block):
+    """Строка документа в виде пары (текст, токены)"""
+    text = block.text()
+    data = block.userData()
+    if data is not None and data.text == text:
+        return text, data.tokens
+    return text, lex_line(text)
+
+
+def document_lines(document):
+    """Строки документа в виде пар (текст, токены) для IncrementalParser.edit.
+
+    Токены берутся из LineTokens, которые подсветка обновляет при каждой правке
+    строки; строки без актуальных токенов разбираются здесь же.
+    """
+    lines = []
+    block = document.firstBlock()
+    while block.isValid():
+        lines.append(block_line(block))
+        block = block.next()
+    return lines
 
 
 class RobotSyntaxHighlighter(QSyntaxHighlighter):
+    """Подсветка синтаксиса по токенам общего лексера (robot_parser.lex_line).
+
+    Токены каждой перекрашиваемой строки сохраняются в ней (LineTokens), и парсер
+    берет их оттуда, не разбирая строку повторно. Многострочных конструкций в
+    языке нет, поэтому состояние всех строк одинаковое: после правки Qt
+    перекрашивает только измененную строку и не переходит к следующим.
+    """
+
+    BLOCK_STATE = 0
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.highlighting_rules = []
+        self.formats = {}
 
         # Ключевые слова
         keyword_format = QTextCharFormat()
         keyword_format.setForeground(QColor("#FF79C6"))
         keyword_format.setFontWeight(QFont.Weight.Bold)
-        keywords = ["нц", "кц", "пока", "если", "то", "иначе", "все", "выбор", "при", "и", "или", "не", "для", "от",
-                    "до", "шаг"]
-        for word in keywords:
-            pattern = QRegularExpression(r"\b" + word + r"\b")
-            self.highlighting_rules.append((pattern, keyword_format))
+        self.formats['keyword'] = keyword_format
 
         # Команды робота
         command_format = QTextCharFormat()
         command_format.setForeground(QColor("#50FA7B"))
         command_format.setFontWeight(QFont.Weight.Bold)
-        commands = ["вверх", "вниз", "влево", "вправо", "закрасить", "свободно", "слева", "справа", "сверху", "снизу"]
-        for word in commands:
-            pattern = QRegularExpression(r"\b" + word + r"\b")
-            self.highlighting_rules.append((pattern, command_format))
+        self.formats['command'] = command_format
 
         # Условия
         condition_format = QTextCharFormat()
         condition_format.setForeground(QColor("#8BE9FD"))
-        conditions = ["стена", "краска", "не_stena", "не_краска"]
-        for word in conditions:
-            pattern = QRegularExpression(r"\b" + word + r"\b")
-            self.highlighting_rules.append((pattern, condition_format))
+        self.formats['condition'] = condition_format
 
         # Числа
         number_format = QTextCharFormat()
         number_format.setForeground(QColor("#BD93F9"))
-        pattern = QRegularExpression(r"\b\d+\b")
-        self.highlighting_rules.append((pattern, number_format))
+        self.formats['number'] = number_format
 
         # Комментарии
         comment_format = QTextCharFormat()
         comment_format.setForeground(QColor("#6272A4"))
-        pattern = QRegularExpression(r"\|[^\n]*")
-        self.highlighting_rules.append((pattern, comment_format))
+        self.formats['comment'] = comment_format
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+        tokens = lex_line(text)
+        self.setCurrentBlockUserData(LineTokens(text, tokens))
+
+        formats = self.formats
+        for start, length, kind in highlight_spans(tokens):
+            self.setFormat(start, length, formats[kind])
+        self.setCurrentBlockState(self.BLOCK_STATE)
+
+
+class DocumentEdits:
+    """Правки строк документа для IncrementalParser.edit.
+
+    Изменения документа (сигнал contentsChange) копятся в pending в виде
+    (первая строка, число удаленных строк, новые строки); первая правка
+    заменяет пустую программу всем документом.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        lines = document_lines(document)
+        self.pending = [(0, 0, lines)]
+        self.line_count = len(lines)  # Число строк документа до очередной правки
+        document.contentsChange.connect(self.contents_changed)
+
+    def contents_changed(self, position, removed, added):
+        document = self.document
+        first = document.findBlock(position).blockNumber()
+        last_block = document.findBlock(position + added)
+        if not last_block.isValid():
+            last_block = document.lastBlock()
+        last = last_block.blockNumber()
+
+        # Строки first..last заменили (last - first + 1 - delta) старых строк
+        count = document.blockCount()
+        delta = count - self.line_count
+        self.line_count = count
+
+        lines = []
+        block = document.findBlockByNumber(first)
+        for _ in range(last - first + 1):
+            lines.append(block_line(block))
+            block = block.next()
+        self.pending.append((first, last - first + 1 - delta, lines))
+
+    def take(self):
+        """Накопленные правки; список правок очищается"""
+        edits, self.pending = self.pending, []
+        return edits
+
+
+class ProgramChecker(QObject):
+    """Проверка программы в фоновом потоке по мере набора.
+
+    Правки документа собираются в DocumentEdits и после паузы в наборе
+    передаются потоку проверки, который применяет их к ProgramValidator.
+    Незакрытый блок (например, только что набранное "нц") тянет сегмент до
+    конца программы, и его проверка в большом файле занимает сотни
+    миллисекунд - поэтому она не выполняется в потоке интерфейса.
+    Сигнал checked передает первую ошибку программы (ProgramError) или None.
+    """
+
+    checked = pyqtSignal(object)
+
+    # Пауза в наборе перед проверкой, мс
+    DELAY = 300
+
+    def __init__(self, document, parent=None):
+        super().__init__(parent)
+        self.edits = DocumentEdits(document)  # Правки, еще не переданные потоку проверки
+        self.revision = 0  # Номер последней переданной пачки правок
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.submit)
+
+        self.tasks = queue.Queue()
+        self.thread = threading.Thread(target=self.work, args=(self.tasks,), daemon=True)
+        self.thread.start()
+
+        document.contentsChange.connect(self.contents_changed)
+        # Документ при создании проверяется сразу
+        self.timer.start(0)
+
+    def contents_changed(self, position, removed, added):
+        # Правку уже записал DocumentEdits, он подключен к сигналу раньше
+        self.timer.start(self.DELAY)
+
+    def submit(self):
+        """Передает накопленные правки потоку проверки"""
+        edits = self.edits.take()
+        if not edits:
+            return
+        self.revision += 1
+        self.tasks.put((self.revision, edits))
+
+    def work(self, tasks):
+        """Поток проверки: применяет правки и сообщает первую ошибку"""
+        validator = ProgramValidator()
+        while True:
+            revision, edits = tasks.get()
+            # Пачки, накопившиеся за время проверки, применяются вместе
+            while True:
+                for edit in edits:
+                    validator.edit(*edit)
+                try:
+                    revision, edits = tasks.get_nowait()
+                except queue.Empty:
+                    break
+            error = validator.first_error()
+            # Результат устарел, если за время проверки текст снова изменился
+            if revision == self.revision and not self.edits.pending:
+                self.checked.emit(error)
 
 
 class RobotExecutor(QWidget):
     execution_finished = pyqtSignal()
 
+    # Скорости воспроизведения в шагах в секунду (пункты speed_combo)
+    SPEEDS = [1, 2, 4, 10, 20, 100, 1000, 10000]
+    # Интервал кадра (~60 кадров в секунду) и доля кадра, отводимая на выполнение шагов
+    FRAME_INTERVAL = 16
+    FRAME_TIME_BUDGET = 0.012
+
+    # Максимальный размер поля
+    MAX_GRID_SIZE = 2000
+
     def __init__(self):
         super().__init__()
-        self.grid_size = 15
         self.cell_size = 30
-        self.robot_pos = QPoint(0, 0)
-        self.robot_direction = Direction.RIGHT
-        self.grid = [[CellType.EMPTY for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+        # Состояние робота, поля и выполнения программы
+        self.machine = RobotMachine(Field(15))
+        # Разбор программы из редактора по правкам (см. parser_edits)
+        self.incremental_parser = IncrementalParser()
         self.is_running = False
-        self.current_command_index = 0
-        self.commands = []
-        self.speed = 500
+        self.steps_per_second = self.SPEEDS[2]
+        self.steps_done = 0  # Шагов выполнено с момента run_started
+        self.run_started = 0.0
         self.timer = QTimer()
         self.timer.timeout.connect(self.execute_next_command)
         self.variables = {}  # Для хранения переменных циклов
+        # Лимиты мгновенного выполнения (None - без ограничения)
+        self.turbo_max_steps = 1_000_000
+        self.turbo_time_limit = 10.0
+        self.trace = None  # Трасса последнего запуска, если запись включена
+        # Шаг трассы, к которому перешли назад (шкала времени, кнопка "Назад"); None - последний записанный
+        self.timeline_position = None
 
         self.init_ui()
 
@@ -123,7 +279,7 @@ class RobotExecutor(QWidget):
         control_panel.addWidget(size_label)
 
         self.size_spin = QSpinBox()
-        self.size_spin.setRange(5, 30)
+        self.size_spin.setRange(5, self.MAX_GRID_SIZE)
         self.size_spin.setValue(self.grid_size)
         self.size_spin.valueChanged.connect(self.resize_grid)
         control_panel.addWidget(self.size_spin)
@@ -133,7 +289,13 @@ class RobotExecutor(QWidget):
         # Поле для рисования
         self.grid_widget = GridWidget(self)
         self.grid_widget.setMinimumSize(500, 500)
-        left_panel.addWidget(self.grid_widget)
+
+        # Большие поля не помещаются в окно - показываем их с прокруткой
+        self.grid_scroll = QScrollArea()
+        self.grid_scroll.setWidget(self.grid_widget)
+        self.grid_scroll.setWidgetResizable(True)
+        self.grid_scroll.setFrameShape(QFrame.Shape.NoFrame)
+        left_panel.addWidget(self.grid_scroll)
 
         left_widget = QWidget()
         left_widget.setLayout(left_panel)
@@ -175,6 +337,18 @@ class RobotExecutor(QWidget):
 
         program_layout.addWidget(self.code_editor)
 
+        # Ошибка в программе, найденная фоновой проверкой
+        self.error_label = QLabel()
+        self.error_label.setWordWrap(True)
+        self.error_label.setStyleSheet("color: #ff5555; font-weight: bold;")
+        self.error_label.hide()
+        program_layout.addWidget(self.error_label)
+
+        # Правки текста для incremental_parser, применяются при загрузке программы
+        self.parser_edits = DocumentEdits(self.code_editor.document())
+        self.checker = ProgramChecker(self.code_editor.document(), self)
+        self.checker.checked.connect(self.show_program_error)
+
         # Кнопки управления выполнением
         exec_buttons_layout = QHBoxLayout()
         exec_buttons_layout.setSpacing(5)
@@ -200,6 +374,28 @@ class RobotExecutor(QWidget):
         self.run_btn.clicked.connect(self.start_execution)
         exec_buttons_layout.addWidget(self.run_btn)
 
+        self.back_btn = QPushButton("Назад")
+        self.back_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #8be9fd;
+                color: #282a36;
+                font-weight: bold;
+                padding: 8px 16px;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #a4f2ff;
+            }
+            QPushButton:disabled {
+                background-color: #6272a4;
+                color: #f8f8f2;
+            }
+        """)
+        self.back_btn.setEnabled(False)
+        self.back_btn.clicked.connect(self.step_back)
+        exec_buttons_layout.addWidget(self.back_btn)
+
         self.step_btn = QPushButton("Шаг")
         self.step_btn.setStyleSheet("""
             QPushButton {
@@ -217,6 +413,27 @@ class RobotExecutor(QWidget):
         self.step_btn.clicked.connect(self.execute_step)
         exec_buttons_layout.addWidget(self.step_btn)
 
+        self.turbo_btn = QPushButton("Мгновенно")
+        self.turbo_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #f1fa8c;
+                color: #282a36;
+                font-weight: bold;
+                padding: 8px 16px;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #f6ffa8;
+            }
+            QPushButton:disabled {
+                background-color: #6272a4;
+                color: #f8f8f2;
+            }
+        """)
+        self.turbo_btn.clicked.connect(self.start_turbo_execution)
+        exec_buttons_layout.addWidget(self.turbo_btn)
+
         self.stop_btn = QPushButton("Стоп")
         self.stop_btn.setStyleSheet("""
             QPushButton {
@@ -240,12 +457,24 @@ class RobotExecutor(QWidget):
 
         program_layout.addLayout(exec_buttons_layout)
 
+        # Шкала времени: переход к любому записанному шагу (см. robot_trace)
+        timeline_layout = QHBoxLayout()
+        self.timeline = QSlider(Qt.Orientation.Horizontal)
+        self.timeline.setEnabled(False)
+        self.timeline.valueChanged.connect(self.seek_timeline)
+        timeline_layout.addWidget(self.timeline)
+        self.timeline_label = QLabel()
+        self.timeline_label.setMinimumWidth(140)
+        timeline_layout.addWidget(self.timeline_label)
+        program_layout.addLayout(timeline_layout)
+
         # Настройки скорости
         speed_layout = QHBoxLayout()
         speed_layout.addWidget(QLabel("Скорость:"))
 
         self.speed_combo = QComboBox()
-        self.speed_combo.addItems(["Очень медленно", "Медленно", "Нормально", "Быстро", "Очень быстро"])
+        self.speed_combo.addItems(["Очень медленно", "Медленно", "Нормально", "Быстро", "Очень быстро",
+                                   "100 шагов/с", "1000 шагов/с", "10000 шагов/с"])
         self.speed_combo.setCurrentIndex(2)
         self.speed_combo.currentIndexChanged.connect(self.change_speed)
         self.speed_combo.setStyleSheet("""
@@ -261,6 +490,17 @@ class RobotExecutor(QWidget):
         speed_layout.addWidget(self.speed_combo)
         speed_layout.addStretch()
 
+        # Запись трассы выполнения (robot_trace)
+        self.trace_check = QCheckBox("Трасса")
+        self.trace_check.setToolTip("Записывать трассу и при мгновенном выполнении (медленнее). "
+                                    "При пошаговом выполнении трасса записывается всегда")
+        speed_layout.addWidget(self.trace_check)
+
+        self.save_trace_btn = QPushButton("Сохранить трассу")
+        self.save_trace_btn.setEnabled(False)
+        self.save_trace_btn.clicked.connect(self.save_trace)
+        speed_layout.addWidget(self.save_trace_btn)
+
         program_layout.addLayout(speed_layout)
 
         program_group.setLayout(program_layout)
@@ -319,6 +559,7 @@ class RobotExecutor(QWidget):
         <li><b style="color: #8be9fd;">сверху стена</b> - сверху есть стена</li>
         <li><b style="color: #8be9fd;">снизу свободно</b> - снизу нет стены</li>
         <li><b style="color: #8be9fd;">снизу стена</b> - снизу есть стена</li>
+        <li><b style="color: #ff79c6;">не</b>, <b style="color: #ff79c6;">и</b>, <b style="color: #ff79c6;">или</b>, скобки - составные условия, например: <b>справа свободно и не снизу стена</b></li>
         </ul>
 
         <h3 style="color: #ff79c6;">Циклы:</h3>
@@ -406,288 +647,147 @@ class RobotExecutor(QWidget):
     def toggle_wall_mode(self):
         self.grid_widget.wall_mode = self.add_walls_btn.isChecked()
 
+    @property
+    def field(self):
+        return self.machine.field
+
+    @property
+    def grid_size(self):
+        return self.machine.field.size
+
+    @property
+    def robot_pos(self):
+        return QPoint(self.machine.x, self.machine.y)
+
+    @robot_pos.setter
+    def robot_pos(self, pos):
+        self.machine.x, self.machine.y = pos.x(), pos.y()
+
+    @property
+    def robot_direction(self):
+        return Direction(self.machine.direction)
+
+    @robot_direction.setter
+    def robot_direction(self, direction):
+        self.machine.direction = direction.value
+
     def clear_grid(self):
-        self.grid = [[CellType.EMPTY for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+        self.discard_trace()
+        self.field.clear()
         self.robot_pos = QPoint(0, 0)
         self.robot_direction = Direction.RIGHT
         self.variables = {}
+        self.grid_widget.invalidate_background()
         self.grid_widget.update()
         self.update_info()
 
     def resize_grid(self, new_size):
-        self.grid_size = new_size
-        self.grid = [[CellType.EMPTY for _ in range(self.grid_size)] for _ in range(self.grid_size)]
+        self.discard_trace()
+        self.field.resize(new_size)
         if self.robot_pos.x() >= self.grid_size or self.robot_pos.y() >= self.grid_size:
             self.robot_pos = QPoint(0, 0)
+        self.grid_widget.update_minimum_size()
+        self.grid_widget.invalidate_background()
         self.grid_widget.update()
 
-    def parse_program(self, code):
-        """Парсит текст программы в список команд с поддержкой всех циклов и условий"""
-        # Сохраняем оригинальные строки с отступами
-        original_lines = code.split('\n')
-        lines = []
+    def load_editor_program(self, record=True):
+        """Загружает программу из редактора: разбираются только измененные строки (см. DocumentEdits).
+
+        record - записывать трассу выполнения (для шкалы времени и сохранения)
+        """
+        for edit in self.parser_edits.take():
+            self.incremental_parser.edit(*edit)
+        nodes = self.incremental_parser.parse()
+        self.discard_trace()
+        self.machine.load(compile_program(nodes))
+        if record:
+            self.trace = ExecutionTrace()
+            self.machine.start_trace(self.trace)
+        self.save_trace_btn.setEnabled(self.trace is not None)
+
+    def discard_trace(self):
+        """Останавливает запись и забывает трассу (новая программа, другое поле)"""
+        self.machine.stop_trace()
+        self.trace = None
+        self.timeline_position = None
+        self.save_trace_btn.setEnabled(False)
+
+    def current_step(self):
+        """Номер текущего шага на шкале времени"""
+        if self.trace is None:
+            return 0
+        return len(self.trace) if self.timeline_position is None else self.timeline_position
+
+    def seek_timeline(self, step):
+        """Переходит к состоянию после step записанных шагов"""
+        if self.trace is None or step == self.current_step():
+            return
+        if self.is_running:
+            self.stop_execution()
+        if self.machine.seek(self.trace, step):
+            self.grid_widget.invalidate_background()
+        self.timeline_position = step if step < len(self.trace) else None
+        self.repaint_dirty()
+        self.update_info()
 
-        # Обрабатываем каждую строку, сохраняя информацию об отступах
-        for line in original_lines:
-            stripped_line = line.strip()
-            # Пропускаем пустые строки и комментарии
-            if not stripped_line or stripped_line.startswith('|'):
-                continue
-
-            # Сохраняем информацию об отступах в самой строке
-            indent_level = len(line) - len(line.lstrip())
-            lines.append({
-                'text': stripped_line,
-                'indent': indent_level,
-                'original': line
-            })
-
-        commands = []
-        i = 0
-
-        while i < len(lines):
-            line_info = lines[i]
-            line = line_info['text']
-            indent = line_info['indent']
-
-            # Простые команды движения
-            if line == 'вверх':
-                commands.append('up')
-            elif line == 'вниз':
-                commands.append('down')
-            elif line == 'влево':
-                commands.append('left')
-            elif line == 'вправо':
-                commands.append('right')
-            elif line == 'закрасить':
-                commands.append('mark')
-
-            # Цикл с предусловием "нц пока ... кц"
-            elif line.startswith('нц пока'):
-                condition_text = line.replace('нц пока', '').strip()
-                condition = self.parse_condition(condition_text)
-
-                # Ищем конец цикла по отступам
-                end_index = self.find_matching_kc_by_indent(lines, i, indent)
-                if end_index == -1:
-                    raise Exception("Не найден конец цикла 'кц'")
-
-                # Извлекаем тело цикла (строки с большим отступом)
-                body_lines = []
-                for j in range(i + 1, end_index):
-                    if lines[j]['indent'] > indent:  # Только строки с большим отступом
-                        body_lines.append(lines[j]['text'])
-
-                body_commands = self.parse_body_commands(body_lines)
-
-                commands.append({
-                    'type': 'while',
-                    'condition': condition,
-                    'body': body_commands,
-                    'current_body_index': 0
-                })
-
-                i = end_index
-
-            # Цикл с постусловием "нц ... кц при ..."
-            elif line == 'нц':
-                # Ищем соответствующий "кц при" по отступам
-                end_index = self.find_matching_kc_pri_by_indent(lines, i, indent)
-                if end_index == -1:
-                    raise Exception("Не найден конец цикла 'кц при'")
-
-                condition_text = lines[end_index]['text'].replace('кц при', '').strip()
-                condition = self.parse_condition(condition_text)
-
-                # Извлекаем тело цикла
-                body_lines = []
-                for j in range(i + 1, end_index):
-                    if lines[j]['indent'] > indent:
-                        body_lines.append(lines[j]['text'])
-
-                body_commands = self.parse_body_commands(body_lines)
-
-                commands.append({
-                    'type': 'do_while',
-                    'condition': condition,
-                    'body': body_commands,
-                    'current_body_index': 0,
-                    'first_execution': True
-                })
-
-                i = end_index
-
-            # Цикл со счетчиком "нц для ... от ... до ..."
-            elif line.startswith('нц для'):
-                # Парсим параметры цикла
-                parts = line.split()
-                if len(parts) < 6 or parts[1] != 'для' or parts[3] != 'от' or parts[5] != 'до':
-                    raise Exception("Неверный формат цикла для. Пример: 'нц для i от 1 до 5'")
-
-                var_name = parts[2]
-                start_val = int(parts[4])
-                end_val = int(parts[6])
-
-                # Опциональный шаг
-                step = 1
-                if len(parts) > 7 and parts[7] == 'шаг':
-                    step = int(parts[8])
-
-                # Ищем конец цикла по отступам
-                end_index = self.find_matching_kc_by_indent(lines, i, indent)
-                if end_index == -1:
-                    raise Exception("Не найден конец цикла 'кц'")
-
-                # Извлекаем тело цикла
-                body_lines = []
-                for j in range(i + 1, end_index):
-                    if lines[j]['indent'] > indent:
-                        body_lines.append(lines[j]['text'])
-
-                body_commands = self.parse_body_commands(body_lines)
-
-                commands.append({
-                    'type': 'for',
-                    'var_name': var_name,
-                    'start': start_val,
-                    'end': end_val,
-                    'step': step,
-                    'current': start_val,
-                    'body': body_commands,
-                    'current_body_index': 0
-                })
-
-                i = end_index
-
-            # Условие "если ... то ..."
-            elif line.startswith('если'):
-                # Ищем "все" по отступам
-                all_index = self.find_matching_all_by_indent(lines, i, indent)
-                if all_index == -1:
-                    raise Exception("Не найден конец условия 'все'")
-
-                # Проверяем есть ли "иначе"
-                else_index = -1
-                for j in range(i + 1, all_index):
-                    if lines[j]['text'] == 'иначе' and lines[j]['indent'] == indent:
-                        else_index = j
-                        break
-
-                # Парсим условие
-                condition_text = line.replace('если', '').replace('то', '').strip()
-                condition = self.parse_condition(condition_text)
-
-                # Парсим тело then
-                then_end = else_index if else_index != -1 else all_index
-                then_lines = []
-                for j in range(i + 1, then_end):
-                    if lines[j]['indent'] > indent:
-                        then_lines.append(lines[j]['text'])
-                then_commands = self.parse_body_commands(then_lines)
-
-                # Парсим тело else (если есть)
-                else_commands = []
-                if else_index != -1:
-                    else_lines = []
-                    for j in range(else_index + 1, all_index):
-                        if lines[j]['indent'] > indent:
-                            else_lines.append(lines[j]['text'])
-                    else_commands = self.parse_body_commands(else_lines)
-
-                commands.append({
-                    'type': 'if',
-                    'condition': condition,
-                    'then_body': then_commands,
-                    'else_body': else_commands,
-                    'current_then_index': 0,
-                    'current_else_index': 0,
-                    'executed': False
-                })
-
-                i = all_index
-
-            i += 1
-
-        return commands
-
-    def find_matching_kc_by_indent(self, lines, start_index, base_indent):
-        """Находит соответствующий 'кц' для цикла по отступам"""
-        for i in range(start_index + 1, len(lines)):
-            if lines[i]['indent'] == base_indent and lines[i]['text'] == 'кц':
-                return i
-        return -1
-
-    def find_matching_kc_pri_by_indent(self, lines, start_index, base_indent):
-        """Находит соответствующий 'кц при' для цикла с постусловием по отступам"""
-        for i in range(start_index + 1, len(lines)):
-            if (lines[i]['indent'] == base_indent and
-                    (lines[i]['text'].startswith('кц при') or lines[i]['text'] == 'кц')):
-                return i
-        return -1
-
-    def find_matching_all_by_indent(self, lines, start_index, base_indent):
-        """Находит соответствующий 'все' для условия по отступам"""
-        for i in range(start_index + 1, len(lines)):
-            if lines[i]['indent'] == base_indent and lines[i]['text'] == 'все':
-                return i
-        return -1
-
-    def parse_body_commands(self, lines):
-        """Парсит тело циклов и условий"""
-        commands = []
-        i = 0
-
-        while i < len(lines):
-            line = lines[i]
-
-            if line == 'вверх':
-                commands.append('up')
-            elif line == 'вниз':
-                commands.append('down')
-            elif line == 'влево':
-                commands.append('left')
-            elif line == 'вправо':
-                commands.append('right')
-            elif line == 'закрасить':
-                commands.append('mark')
-            # Обработка вложенных конструкций будет происходить в основном парсере
-            i += 1
-
-        return commands
-
-    def parse_condition(self, condition_text):
-        """Парсит условие"""
-        condition_text = condition_text.strip()
-
-        conditions_map = {
-            'справа свободно': 'right_free',
-            'справа стена': 'right_wall',
-            'слева свободно': 'left_free',
-            'слева стена': 'left_wall',
-            'сверху свободно': 'top_free',
-            'сверху стена': 'top_wall',
-            'снизу свободно': 'bottom_free',
-            'снизу стена': 'bottom_wall'
-        }
+    def step_back(self):
+        self.seek_timeline(self.current_step() - 1)
+
+    def resume_recording(self):
+        """Продолжение выполнения после перехода назад: записанное будущее отбрасывается"""
+        if self.trace is not None and self.timeline_position is not None:
+            self.trace.truncate(self.timeline_position)
+            self.timeline_position = None
+
+    def update_timeline(self):
+        length = len(self.trace) if self.trace is not None else 0
+        step = self.current_step()
+        self.timeline.blockSignals(True)
+        self.timeline.setRange(0, length)
+        self.timeline.setValue(step)
+        self.timeline.blockSignals(False)
+        self.timeline.setEnabled(self.trace is not None and not self.is_running)
+        self.back_btn.setEnabled(step > 0 and not self.is_running)
+        self.timeline_label.setText(f"Шаг {step} из {length}" if self.trace is not None else "")
+
+    def save_trace(self):
+        """Сохраняет трассу последнего запуска в файл"""
+        if self.trace is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить трассу", "", "Трасса Робота (*.trace)")
+        if not path:
+            return
+        try:
+            self.trace.save(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить трассу: {str(e)}")
 
-        return conditions_map.get(condition_text, condition_text)
-
-    def check_condition(self, condition):
-        """Проверяет условие"""
-        x, y = self.robot_pos.x(), self.robot_pos.y()
-
-        conditions_map = {
-            'right_free': x + 1 < self.grid_size and self.grid[y][x + 1] != CellType.WALL,
-            'right_wall': x + 1 >= self.grid_size or self.grid[y][x + 1] == CellType.WALL,
-            'left_free': x - 1 >= 0 and self.grid[y][x - 1] != CellType.WALL,
-            'left_wall': x - 1 < 0 or self.grid[y][x - 1] == CellType.WALL,
-            'top_free': y - 1 >= 0 and self.grid[y - 1][x] != CellType.WALL,
-            'top_wall': y - 1 < 0 or self.grid[y - 1][x] == CellType.WALL,
-            'bottom_free': y + 1 < self.grid_size and self.grid[y + 1][x] != CellType.WALL,
-            'bottom_wall': y + 1 >= self.grid_size or self.grid[y + 1][x] == CellType.WALL
-        }
+    def show_program_error(self, error):
+        """Подчеркивает строку с ошибкой, найденной фоновой проверкой (None - ошибок нет)"""
+        if error is None:
+            self.code_editor.setExtraSelections([])
+            self.error_label.hide()
+            return
 
-        return conditions_map.get(condition, False)
+        document = self.code_editor.document()
+        line = min(max(error.line, 1), document.blockCount())
+        selection = QTextEdit.ExtraSelection()
+        selection.format.setUnderlineStyle(QTextCharFormat.UnderlineStyle.WaveUnderline)
+        selection.format.setUnderlineColor(QColor("#ff5555"))
+        selection.format.setToolTip(str(error))
+        cursor = QTextCursor(document.findBlockByNumber(line - 1))
+        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+        selection.cursor = cursor
+        self.code_editor.setExtraSelections([selection])
+
+        self.error_label.setText(str(error))
+        self.error_label.show()
+
+    def show_execution_error(self, error):
+        """Сообщает об ошибке выполнения; строку зациклившейся программы подчеркивает в редакторе"""
+        if isinstance(error, ProgramError):
+            self.show_program_error(error)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения: {str(error)}")
 
     def start_execution(self):
         code = self.code_editor.toPlainText().strip()
@@ -696,213 +796,132 @@ class RobotExecutor(QWidget):
             return
 
         try:
-            self.commands = self.parse_program(code)
-            if not self.commands:
+            self.load_editor_program()
+            if not len(self.machine.program):
                 QMessageBox.warning(self, "Предупреждение", "Не удалось распознать команды!")
                 return
 
             self.is_running = True
-            self.current_command_index = 0
             self.run_btn.setEnabled(False)
             self.step_btn.setEnabled(False)
-            self.timer.start(self.speed)
+            self.turbo_btn.setEnabled(False)
+            self.update_timeline()
+            self.restart_clock()
+            self.timer.start(self.FRAME_INTERVAL)
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка в программе: {str(e)}")
 
+    def start_turbo_execution(self):
+        """Выполняет программу мгновенно, без таймера и перерисовки на каждом шаге"""
+        code = self.code_editor.toPlainText().strip()
+        if not code:
+            QMessageBox.warning(self, "Предупреждение", "Введите программу для выполнения!")
+            return
+
+        try:
+            self.load_editor_program(self.trace_check.isChecked())
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка в программе: {str(e)}")
+            return
+
+        if not len(self.machine.program):
+            QMessageBox.warning(self, "Предупреждение", "Не удалось распознать команды!")
+            return
+
+        self.stop_execution()
+        try:
+            self.run_to_completion(self.turbo_max_steps, self.turbo_time_limit)
+            self.execution_finished.emit()
+        except Exception as e:
+            self.show_execution_error(e)
+        finally:
+            self.repaint_dirty()
+            self.update_info()
+
+    def run_to_completion(self, max_steps=None, time_limit=None):
+        """Выполняет программу без таймера до конца (см. RobotMachine.run)"""
+        return self.machine.run(max_steps, time_limit)
+
     def stop_execution(self):
         self.is_running = False
         self.timer.stop()
         self.run_btn.setEnabled(True)
         self.step_btn.setEnabled(True)
+        self.turbo_btn.setEnabled(True)
+        self.update_timeline()
 
     def execute_step(self):
-        if self.current_command_index < len(self.commands):
-            self.execute_command(self.commands[self.current_command_index])
+        self.resume_recording()
+        if not self.machine.finished:
+            self.execute_command()
         else:
             self.stop_execution()
 
+    def restart_clock(self):
+        """Начинает отсчет шагов для воспроизведения с текущего момента"""
+        self.run_started = time.perf_counter()
+        self.steps_done = 0
+
     def execute_next_command(self):
-        if self.current_command_index >= len(self.commands):
+        """Кадр воспроизведения: выполняет шаги, накопившиеся с прошлого кадра, и один раз обновляет интерфейс"""
+        machine = self.machine
+        now = time.perf_counter()
+        owed = int((now - self.run_started) * self.steps_per_second) - self.steps_done
+        deadline = now + self.FRAME_TIME_BUDGET
+        executed = 0
+
+        try:
+            while executed < owed and not machine.finished:
+                machine.advance()
+                executed += 1
+                if executed & 0xFF == 0 and time.perf_counter() > deadline:
+                    break
+        except Exception as e:
             self.stop_execution()
-            self.execution_finished.emit()
+            self.repaint_dirty()
+            self.update_info()
+            self.show_execution_error(e)
             return
 
-        self.execute_command(self.commands[self.current_command_index])
+        self.steps_done += executed
+        if executed < owed and not machine.finished:
+            # Не успеваем за заданной скоростью - не копим отставание
+            self.run_started = now - self.steps_done / self.steps_per_second
 
-    def execute_command(self, command):
+        if executed:
+            self.repaint_dirty()
+            self.update_info()
+
+        if machine.finished:
+            self.stop_execution()
+            self.execution_finished.emit()
+
+    def execute_command(self):
+        """Выполняет один шаг программы и обновляет интерфейс"""
         try:
-            if isinstance(command, dict):
-                if command['type'] == 'while':
-                    self.execute_while_loop(command)
-                elif command['type'] == 'do_while':
-                    self.execute_do_while_loop(command)
-                elif command['type'] == 'for':
-                    self.execute_for_loop(command)
-                elif command['type'] == 'if':
-                    self.execute_if_statement(command)
-            else:
-                # Простые команды
-                self.execute_simple_command(command)
-                self.current_command_index += 1
+            self.machine.advance()
 
-            self.grid_widget.update()
+            self.repaint_dirty()
             self.update_info()
 
         except Exception as e:
             self.stop_execution()
-            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения: {str(e)}")
-
-    def execute_if_statement(self, if_command):
-        """Выполняет условие если...то...иначе...все"""
-        if not if_command['executed']:
-            # Первое выполнение - проверяем условие
-            if self.check_condition(if_command['condition']):
-                # Условие истинно - выполняем then_body
-                if_command['branch'] = 'then'
-            else:
-                # Условие ложно - выполняем else_body (если есть)
-                if_command['branch'] = 'else' if if_command['else_body'] else None
-
-            if_command['executed'] = True
-
-        # Выполняем команды из выбранной ветки
-        if if_command['branch'] == 'then':
-            if if_command['current_then_index'] < len(if_command['then_body']):
-                body_command = if_command['then_body'][if_command['current_then_index']]
-                if isinstance(body_command, dict) and body_command['type'] == 'if':
-                    self.execute_if_statement(body_command)
-                else:
-                    self.execute_simple_command(body_command)
-                if_command['current_then_index'] += 1
-            else:
-                # Завершили выполнение then ветки
-                if_command['current_then_index'] = 0
-                if_command['executed'] = False
-                self.current_command_index += 1
-
-        elif if_command['branch'] == 'else':
-            if if_command['current_else_index'] < len(if_command['else_body']):
-                body_command = if_command['else_body'][if_command['current_else_index']]
-                if isinstance(body_command, dict) and body_command['type'] == 'if':
-                    self.execute_if_statement(body_command)
-                else:
-                    self.execute_simple_command(body_command)
-                if_command['current_else_index'] += 1
-            else:
-                # Завершили выполнение else ветки
-                if_command['current_else_index'] = 0
-                if_command['executed'] = False
-                self.current_command_index += 1
-
-        else:
-            # Нет else ветки - просто завершаем
-            if_command['executed'] = False
-            self.current_command_index += 1
-
-    def execute_simple_command(self, command):
-        """Выполняет простую команду"""
-        if command == 'up':
-            self.move_robot('up')
-        elif command == 'down':
-            self.move_robot('down')
-        elif command == 'left':
-            self.move_robot('left')
-        elif command == 'right':
-            self.move_robot('right')
-        elif command == 'mark':
-            self.mark_cell()
-
-    def execute_while_loop(self, loop_command):
-        """Цикл с предусловием - проверяет условие ДО выполнения тела"""
-        if self.check_condition(loop_command['condition']):
-            # Условие истинно - выполняем тело
-            if loop_command['current_body_index'] < len(loop_command['body']):
-                body_command = loop_command['body'][loop_command['current_body_index']]
-                self.execute_simple_command(body_command)
-                loop_command['current_body_index'] += 1
-            else:
-                # Конец тела - сбрасываем индекс для следующей итерации
-                loop_command['current_body_index'] = 0
-        else:
-            # Условие ложно - завершаем цикл
-            loop_command['current_body_index'] = 0
-            self.current_command_index += 1
-
-    def execute_do_while_loop(self, loop_command):
-        """Цикл с постусловием - выполняет тело ХОТЯ БЫ ОДИН РАЗ, затем проверяет условие"""
-        if loop_command['first_execution'] or self.check_condition(loop_command['condition']):
-            # Первое выполнение или условие истинно - выполняем тело
-            loop_command['first_execution'] = False
-
-            if loop_command['current_body_index'] < len(loop_command['body']):
-                body_command = loop_command['body'][loop_command['current_body_index']]
-                if isinstance(body_command, dict) and body_command['type'] == 'if':
-                    self.execute_if_statement(body_command)
-                else:
-                    self.execute_simple_command(body_command)
-                loop_command['current_body_index'] += 1
-            else:
-                # Конец тела - сбрасываем индекс и проверяем условие
-                loop_command['current_body_index'] = 0
-        else:
-            # Условие ложно - завершаем цикл
-            loop_command['current_body_index'] = 0
-            loop_command['first_execution'] = True
-            self.current_command_index += 1
-
-    def execute_for_loop(self, loop_command):
-        """Цикл со счетчиком"""
-        if loop_command['current'] <= loop_command['end']:
-            # Выполняем текущую команду из тела
-            if loop_command['current_body_index'] < len(loop_command['body']):
-                body_command = loop_command['body'][loop_command['current_body_index']]
-                if isinstance(body_command, dict) and body_command['type'] == 'if':
-                    self.execute_if_statement(body_command)
-                else:
-                    self.execute_simple_command(body_command)
-                loop_command['current_body_index'] += 1
-            else:
-                # Конец тела - увеличиваем счетчик и сбрасываем индекс тела
-                loop_command['current'] += loop_command['step']
-                loop_command['current_body_index'] = 0
-        else:
-            # Цикл завершен
-            self.current_command_index += 1
-
-    def move_robot(self, direction):
-        new_pos = QPoint(self.robot_pos)
-
-        if direction == 'up':
-            new_pos.setY(self.robot_pos.y() - 1)
-            self.robot_direction = Direction.UP
-        elif direction == 'right':
-            new_pos.setX(self.robot_pos.x() + 1)
-            self.robot_direction = Direction.RIGHT
-        elif direction == 'down':
-            new_pos.setY(self.robot_pos.y() + 1)
-            self.robot_direction = Direction.DOWN
-        elif direction == 'left':
-            new_pos.setX(self.robot_pos.x() - 1)
-            self.robot_direction = Direction.LEFT
-
-        # Проверка границ и стен
-        if (0 <= new_pos.x() < self.grid_size and
-                0 <= new_pos.y() < self.grid_size and
-                self.grid[new_pos.y()][new_pos.x()] != CellType.WALL):
-            self.robot_pos = new_pos
-        else:
-            raise Exception(f"Робот не может двигаться {direction} - там стена или граница!")
+            self.repaint_dirty()
+            self.show_execution_error(e)
 
-    def mark_cell(self):
-        if self.grid[self.robot_pos.y()][self.robot_pos.x()] == CellType.EMPTY:
-            self.grid[self.robot_pos.y()][self.robot_pos.x()] = CellType.MARKED
+    def repaint_dirty(self):
+        """Перерисовывает клетки, изменившиеся после прошлой перерисовки"""
+        if self.machine.dirty_cells is None:
+            self.grid_widget.update()
+        elif self.machine.dirty_cells:
+            self.grid_widget.update_cells(self.machine.dirty_cells)
+        self.machine.dirty_cells = []
 
     def change_speed(self, index):
-        speeds = [1000, 500, 250, 100, 50]
-        self.speed = speeds[index]
+        self.steps_per_second = self.SPEEDS[index]
         if self.timer.isActive():
-            self.timer.setInterval(self.speed)
+            self.restart_clock()
 
     def update_info(self):
         direction_names = {
@@ -912,83 +931,174 @@ class RobotExecutor(QWidget):
             Direction.LEFT: "Влево"
         }
 
-        info = f"Позиция: ({self.robot_pos.x()}, {self.robot_pos.y()})\n"
+        program = self.machine.program
+        pc = self.machine.pc
+        x, y = self.machine.x, self.machine.y
+        info = f"Позиция: ({x}, {y})\n"
         info += f"Направление: {direction_names[self.robot_direction]}\n"
-        info += f"Команд в программе: {len(self.commands)}\n"
-
-        if self.current_command_index < len(self.commands):
-            current_command = self.commands[self.current_command_index]
-            if isinstance(current_command, dict):
-                info += f"Текущая команда: {current_command['type']}\n"
-            else:
-                info += f"Текущая команда: {current_command}\n"
+        info += "До стены: " + ", ".join(
+            f"{name.lower()} {self.field.wall_distance(x, y, direction.value)}"
+            for direction, name in direction_names.items()) + "\n"
+        info += f"Инструкций в программе: {len(program)}\n"
+
+        if pc < len(program):
+            info += f"Текущая команда: {program.describe(pc)} (строка {program.lines[pc]})\n"
         else:
             info += "Текущая команда: Завершено\n"
 
         self.info_text.setPlainText(info)
+        self.update_timeline()
 
 
 class GridWidget(QWidget):
+    # Минимальный размер клетки в пикселях; более крупные поля прокручиваются
+    MIN_CELL_SIZE = 3
+    # Статический слой кэшируется в QPixmap, только если он не больше этого числа пикселей
+    MAX_BACKGROUND_PIXELS = 4096 * 4096
+    # При большем числе измененных клеток перерисовывается весь виджет
+    MAX_DIRTY_CELLS = 256
+
     def __init__(self, executor):
         super().__init__()
         self.executor = executor
         self.wall_mode = False
         self.setMinimumSize(500, 500)
+        # Кэш статического слоя: сетка, фон и стены
+        self.background = None
+        self.background_cell_size = 0
+
+    def update_minimum_size(self):
+        side = max(500, self.executor.grid_size * self.MIN_CELL_SIZE)
+        self.setMinimumSize(side, side)
+
+    def cell_size(self):
+        return max(self.MIN_CELL_SIZE, min(self.width() // self.executor.grid_size,
+                                           self.height() // self.executor.grid_size))
+
+    def cell_rect(self, x, y):
+        cell_size = self.cell_size()
+        return QRect(x * cell_size, y * cell_size, cell_size, cell_size)
+
+    def invalidate_background(self):
+        """Сбрасывает кэш статического слоя после изменения стен или размера поля"""
+        self.background = None
+
+    def update_cells(self, cells):
+        """Запрашивает перерисовку только перечисленных клеток (x, y)"""
+        cells = set(cells)
+        if len(cells) > self.MAX_DIRTY_CELLS:
+            self.update()
+            return
+        for x, y in cells:
+            self.update(self.cell_rect(x, y))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.invalidate_background()
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
-            cell_size = min(self.width() // self.executor.grid_size,
-                            self.height() // self.executor.grid_size)
+            cell_size = self.cell_size()
             x = event.pos().x() // cell_size
             y = event.pos().y() // cell_size
 
-            if 0 <= x < self.executor.grid_size and 0 <= y < self.executor.grid_size:
+            field = self.executor.field
+            if field.inside(x, y):
+                # Записанные ключевые кадры не содержат ручных правок поля и робота
+                self.executor.discard_trace()
                 if self.wall_mode:
                     # Переключаем стену
-                    if self.executor.grid[y][x] == CellType.EMPTY:
-                        self.executor.grid[y][x] = CellType.WALL
-                    elif self.executor.grid[y][x] == CellType.WALL:
-                        self.executor.grid[y][x] = CellType.EMPTY
+                    field.toggle_wall(x, y)
+                    self.invalidate_background()
+                    self.update(self.cell_rect(x, y))
                 else:
                     # Перемещаем робота
-                    if self.executor.grid[y][x] != CellType.WALL:
+                    if field.get(x, y) != WALL:
+                        old_pos = self.executor.robot_pos
                         self.executor.robot_pos = QPoint(x, y)
+                        self.update_cells([(old_pos.x(), old_pos.y()), (x, y)])
 
-                self.update()
                 self.executor.update_info()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
-        cell_size = min(self.width() // self.executor.grid_size,
-                        self.height() // self.executor.grid_size)
+    def background_pixmap(self, cell_size):
+        """Статический слой поля, при необходимости перестраивает его"""
+        side = self.executor.grid_size * cell_size + 1
+        if side * side > self.MAX_BACKGROUND_PIXELS:
+            return None
+
+        if self.background is None or self.background_cell_size != cell_size:
+            self.background = QPixmap(side, side)
+            self.background_cell_size = cell_size
+            painter = QPainter(self.background)
+            self.paint_static(painter, QRect(0, 0, side, side), cell_size)
+            painter.end()
+        return self.background
+
+    def visible_cells(self, area, cell_size):
+        """Диапазоны клеток [x_start, x_end) и [y_start, y_end), попадающих в область"""
+        size = self.executor.grid_size
+        x_start = max(0, area.left() // cell_size)
+        x_end = min(size, area.right() // cell_size + 1)
+        y_start = max(0, area.top() // cell_size)
+        y_end = min(size, area.bottom() // cell_size + 1)
+        return x_start, x_end, y_start, y_end
+
+    def paint_cells(self, painter, area, cell_size, code, color):
+        """Закрашивает клетки с кодом code внутри области"""
+        field = self.executor.field
+        x_start, x_end, y_start, y_end = self.visible_cells(area, cell_size)
+        for y in range(y_start, y_end):
+            row = field.row(y, x_start, x_end)
+            offset = row.find(code)
+            while offset != -1:
+                painter.fillRect((x_start + offset) * cell_size, y * cell_size, cell_size, cell_size, color)
+                offset = row.find(code, offset + 1)
+
+    def paint_static(self, painter, area, cell_size):
+        """Рисует сетку, фон пустых клеток и стены"""
+        size = self.executor.grid_size
 
         # Рисуем сетку
         painter.setPen(QPen(QColor("#44475a"), 1))
-        for i in range(self.executor.grid_size + 1):
+        for i in range(size + 1):
             # Вертикальные линии
-            painter.drawLine(i * cell_size, 0, i * cell_size, self.executor.grid_size * cell_size)
+            painter.drawLine(i * cell_size, 0, i * cell_size, size * cell_size)
             # Горизонтальные линии
-            painter.drawLine(0, i * cell_size, self.executor.grid_size * cell_size, i * cell_size)
+            painter.drawLine(0, i * cell_size, size * cell_size, i * cell_size)
 
-        # Рисуем клетки
-        for y in range(self.executor.grid_size):
-            for x in range(self.executor.grid_size):
-                rect = (x * cell_size, y * cell_size, cell_size, cell_size)
+        # Темный фон для пустых клеток одним прямоугольником
+        x_start, x_end, y_start, y_end = self.visible_cells(area, cell_size)
+        if x_start < x_end and y_start < y_end:
+            painter.fillRect(x_start * cell_size, y_start * cell_size, (x_end - x_start) * cell_size,
+                             (y_end - y_start) * cell_size, QColor("#282a36"))
 
-                if self.executor.grid[y][x] == CellType.WALL:
-                    painter.fillRect(*rect, QColor("#ff5555"))  # Красный для стен
-                elif self.executor.grid[y][x] == CellType.MARKED:
-                    painter.fillRect(*rect, QColor("#50fa7b"))  # Зеленый для закрашенных
-                else:
-                    painter.fillRect(*rect, QColor("#282a36"))  # Темный для пустых
+        self.paint_cells(painter, area, cell_size, WALL, QColor("#ff5555"))  # Красный для стен
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        cell_size = self.cell_size()
+        area = event.rect()
+
+        # Статический слой берем из кэша, динамический рисуем только в области перерисовки
+        background = self.background_pixmap(cell_size)
+        if background is not None:
+            source = area.intersected(background.rect())
+            painter.drawPixmap(source, background, source)
+        else:
+            self.paint_static(painter, area, cell_size)
+
+        self.paint_cells(painter, area, cell_size, MARKED, QColor("#50fa7b"))  # Зеленый для закрашенных
 
         # Рисуем робота
         robot_x = self.executor.robot_pos.x() * cell_size
         robot_y = self.executor.robot_pos.y() * cell_size
+        if not area.intersects(QRect(robot_x, robot_y, cell_size, cell_size)):
+            return
 
         # Тело робота
+        painter.setPen(QPen(QColor("#44475a"), 1))
         painter.setBrush(QBrush(QColor("#bd93f9")))  # Фиолетовый
         painter.drawEllipse(robot_x + 5, robot_y + 5, cell_size - 10, cell_size - 10)
 
@@ -1009,9 +1119,25 @@ class GridWidget(QWidget):
 
 # Вкладка для исполнителя робота
 class RobotExecutorTab(QWidget):
+    """Вкладка исполнителя. RobotExecutor со всеми виджетами создается при первом показе"""
+
     def __init__(self):
         super().__init__()
-        self.executor = RobotExecutor()
+        self.executor_widget = None
         layout = QVBoxLayout()
-        layout.addWidget(self.executor)
-        self.setLayout(layout)
\ No newline at end of file
+        self.setLayout(layout)
+
+    def ensure_executor(self):
+        """Создает RobotExecutor, если он еще не создан"""
+        if self.executor_widget is None:
+            self.executor_widget = RobotExecutor()
+            self.layout().addWidget(self.executor_widget)
+        return self.executor_widget
+
+    @property
+    def executor(self):
+        return self.ensure_executor()
+
+    def showEvent(self, event):
+        self.ensure_executor()
+        super().showEvent(event)
\ No newline at end of file
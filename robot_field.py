@@ -0,0 +1,330 @@
+# Модель поля Робота: клетки хранятся в одном плоском bytearray,
+# клетка (x, y) находится по индексу y * size + x.
+
+from array import array
+
+# Коды клеток
+EMPTY = 0
+WALL = 1
+MARKED = 2
+
+# Стороны клетки (совпадают со значениями Direction) и смещения к соседям
+UP, RIGHT, DOWN, LEFT = 0, 1, 2, 3
+DX = (0, 1, 0, -1)
+DY = (-1, 0, 1, 0)
+OPPOSITE = (DOWN, LEFT, UP, RIGHT)
+
+# Для run_length: таблица истинности условия -> таблица bytes.translate, 1 - маска не подходит
+_stop_tables = {}
+
+
+def stop_table(table):
+    stops = _stop_tables.get(table)
+    if stops is None:
+        stops = _stop_tables[table] = bytes(0 if m < 16 and table >> m & 1 else 1 for m in range(256))
+    return stops
+
+
+# Код клетки -> 1 для стены, 0 для остальных: сравнение расположения стен двух полей
+_wall_cells = bytes(1 if code == WALL else 0 for code in range(256))
+
+# Для DistanceIndex: маска соседей -> 1, если с этой стороны стена или граница
+_wall_tables = tuple(bytes(m >> side & 1 for m in range(256)) for side in (UP, RIGHT, DOWN, LEFT))
+
+
+class DistanceIndex:
+    """Расстояния от каждой клетки до ближайшей стены или границы в четырех направлениях.
+
+    distance(x, y, side) - сколько ходов робот может сделать из клетки в сторону
+    side. Таблицы строятся по рядам (влево и вправо) и столбцам (вверх и вниз):
+    изменение стены помечает устаревшими только свой ряд и столбец, и они
+    пересчитываются при следующем запросе к ним.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        size = field.size
+        self.typecode = 'H' if size <= 0x10000 else 'I'
+        zeros = bytes(array(self.typecode).itemsize * size * size)
+        self.tables = [array(self.typecode, zeros) for _ in range(4)]
+        self.dirty_rows = set(range(size))
+        self.dirty_columns = set(range(size))
+
+    def wall_changed(self, x, y):
+        """Стена в клетке (x, y) появилась или исчезла"""
+        self.dirty_rows.add(y)
+        self.dirty_columns.add(x)
+
+    def distance(self, x, y, side):
+        if side == RIGHT or side == LEFT:
+            if y in self.dirty_rows:
+                self.dirty_rows.discard(y)
+                self.rebuild_line(y * self.field.size, 1, RIGHT, LEFT)
+        elif x in self.dirty_columns:
+            self.dirty_columns.discard(x)
+            self.rebuild_line(x, self.field.size, DOWN, UP)
+        return self.tables[side][y * self.field.size + x]
+
+    def rebuild_line(self, start, step, forward, backward):
+        """Пересчитывает ряд или столбец: клетки start, start + step, ...
+
+        Линия делится стенами на отрезки, каждый заполняется одним range,
+        поэтому цикл на Python идет по стенам, а не по клеткам.
+        """
+        size = self.field.size
+        stop = start + step * size
+        line = self.field.masks[start:stop:step]
+
+        # Вперед: расстояние до ближайшей клетки со стеной с этой стороны (последняя клетка - граница)
+        stops = line.translate(_wall_tables[forward])
+        values = array(self.typecode)
+        begin = 0
+        while begin < size:
+            end = stops.find(1, begin)
+            values.extend(range(end - begin, -1, -1))
+            begin = end + 1
+        self.tables[forward][start:stop:step] = values
+
+        # Назад: расстояние до ближайшей такой клетки позади (первая клетка - граница)
+        stops = line.translate(_wall_tables[backward])
+        values = array(self.typecode)
+        begin = 0
+        while begin < size:
+            end = stops.find(1, begin + 1)
+            if end < 0:
+                end = size
+            values.extend(range(end - begin))
+            begin = end
+        self.tables[backward][start:stop:step] = values
+
+
+class Field:
+    """Квадратное поле size x size с кодами клеток EMPTY/WALL/MARKED.
+
+    Для каждой клетки хранится 4-битная маска соседей masks: бит side
+    установлен, если с этой стороны стена или граница поля. Маска
+    обновляется при изменении стен, поэтому датчик робота - одна проверка бита.
+    Расстояния до стен (DistanceIndex) создаются при первом обращении к distances.
+    version увеличивается при каждом изменении клеток: одинаковая версия
+    означает неизмененное поле.
+    """
+
+    def __init__(self, size):
+        self.version = 0
+        self.resize(size)
+
+    def clear(self):
+        """Очищает поле, не меняя размер"""
+        self.version += 1
+        self.cells = bytearray(self.size * self.size)
+        self.masks = bytearray(self.border_masks)
+        self.distance_index = None
+
+    @property
+    def distances(self):
+        """Расстояния до стен (DistanceIndex), обновляемые при изменении стен"""
+        if self.distance_index is None:
+            self.distance_index = DistanceIndex(self)
+        return self.distance_index
+
+    def free_distance(self, x, y, side):
+        """Сколько ходов подряд робот может сделать из клетки (x, y) в сторону side"""
+        return self.distances.distance(x, y, side)
+
+    def wall_distance(self, x, y, side):
+        """То же, что free_distance, но без построения таблиц DistanceIndex.
+
+        Для разовых запросов (панель информации): если таблицы еще не нужны
+        выполнению, ряд или столбец просматривается срезом, как в run_length.
+        """
+        if self.distance_index is not None:
+            return self.distance_index.distance(x, y, side)
+        line = self.line_masks(x, y, side)
+        length = line.translate(_wall_tables[side]).find(1)
+        return len(line) if length < 0 else length
+
+    def resize(self, size):
+        """Меняет размер поля. Содержимое поля сбрасывается"""
+        self.size = size
+        self.border_masks = self.make_border_masks(size)
+        self.clear()
+
+    @staticmethod
+    def make_border_masks(size):
+        """Маски соседей пустого поля: стены только у границ"""
+        masks = bytearray(size * size)
+        for i in range(size):
+            masks[i] |= 1 << UP
+            masks[i * size + size - 1] |= 1 << RIGHT
+            masks[(size - 1) * size + i] |= 1 << DOWN
+            masks[i * size] |= 1 << LEFT
+        return bytes(masks)
+
+    def inside(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def get(self, x, y):
+        return self.cells[y * self.size + x]
+
+    def set(self, x, y, code):
+        index = y * self.size + x
+        old = self.cells[index]
+        if old == code:
+            return
+        self.cells[index] = code
+        self.version += 1
+        if (old == WALL) != (code == WALL):
+            self.update_neighbour_masks(x, y, code == WALL)
+            if self.distance_index is not None:
+                self.distance_index.wall_changed(x, y)
+
+    def update_neighbour_masks(self, x, y, wall):
+        """Обновляет маски четырех соседей клетки, в которой появилась или исчезла стена"""
+        size = self.size
+        for side in (UP, RIGHT, DOWN, LEFT):
+            nx, ny = x + DX[side], y + DY[side]
+            if 0 <= nx < size and 0 <= ny < size:
+                bit = 1 << OPPOSITE[side]
+                if wall:
+                    self.masks[ny * size + nx] |= bit
+                else:
+                    self.masks[ny * size + nx] &= ~bit
+
+    def is_wall(self, x, y):
+        """Стена или граница поля"""
+        size = self.size
+        return not (0 <= x < size and 0 <= y < size) or self.cells[y * size + x] == WALL
+
+    def mask(self, x, y):
+        """Маска соседей клетки (x, y)"""
+        return self.masks[y * self.size + x]
+
+    def line_masks(self, x, y, direction):
+        """Маски соседей клеток от (x, y) до границы поля в направлении direction"""
+        size = self.size
+        index = y * size + x
+        if direction == RIGHT:
+            return self.masks[index:index - x + size]
+        if direction == LEFT:
+            return self.masks[index - x:index + 1][::-1]
+        if direction == DOWN:
+            return self.masks[index::size]
+        return self.masks[x:index + 1:size][::-1]
+
+    def run_length(self, x, y, direction, table):
+        """Сколько клеток подряд от (x, y) в направлении direction имеют подходящую маску соседей.
+
+        table - таблица истинности условия (robot_compiler.condition_table): маска m
+        подходит, если бит m установлен. Ряд или столбец просматривается одним
+        срезом masks, без цикла по клеткам.
+        """
+        line = self.line_masks(x, y, direction)
+        length = line.translate(stop_table(table)).find(1)
+        return len(line) if length < 0 else length
+
+    def load_cells(self, cells):
+        """Заменяет содержимое поля того же размера, например из ключевого кадра трассы.
+
+        Маски соседей пересчитываются, только если изменилось расположение стен.
+        Возвращает True, если стены изменились.
+        """
+        walls_changed = cells.translate(_wall_cells) != self.cells.translate(_wall_cells)
+        self.cells = bytearray(cells)
+        self.version += 1
+        if walls_changed:
+            self.masks = bytearray(self.border_masks)
+            self.distance_index = None
+            size = self.size
+            index = self.cells.find(WALL)
+            while index >= 0:
+                self.update_neighbour_masks(index % size, index // size, True)
+                index = self.cells.find(WALL, index + 1)
+        return walls_changed
+
+    def mark(self, x, y):
+        """Закрашивает пустую клетку"""
+        index = y * self.size + x
+        if self.cells[index] == EMPTY:
+            self.cells[index] = MARKED
+            self.version += 1
+
+    def toggle_wall(self, x, y):
+        """Ставит стену в пустую клетку или убирает существующую"""
+        code = self.get(x, y)
+        if code == EMPTY:
+            self.set(x, y, WALL)
+        elif code == WALL:
+            self.set(x, y, EMPTY)
+
+    def count(self, code):
+        """Количество клеток с кодом code"""
+        return self.cells.count(code)
+
+    def find_all(self, code):
+        """Координаты (x, y) клеток с кодом code, построчно"""
+        size = self.size
+        index = self.cells.find(code)
+        while index != -1:
+            yield index % size, index // size
+            index = self.cells.find(code, index + 1)
+
+    def row(self, y, x_start=0, x_end=None):
+        """Коды клеток строки y на отрезке [x_start, x_end)"""
+        base = y * self.size
+        return self.cells[base + x_start:base + (self.size if x_end is None else x_end)]
+
+    def copy(self):
+        """Независимая копия поля"""
+        field = Field.__new__(Field)
+        field.size = self.size
+        field.version = self.version
+        field.border_masks = self.border_masks
+        field.cells = bytearray(self.cells)
+        field.masks = bytearray(self.masks)
+        field.distance_index = None
+        return field
+
+
+# Текстовый формат поля: по строке на ряд клеток
+FIELD_CHARS = {'.': EMPTY, '#': WALL, '*': MARKED}
+CELL_CHARS = {code: char for char, code in FIELD_CHARS.items()}
+ROBOT_CHAR = 'R'  # Стартовая клетка робота (пустая)
+
+
+def parse_field(text):
+    """Читает поле из текстового вида.
+
+    Пустые строки и строки, начинающиеся с ';', пропускаются. Возвращает
+    (Field, (x, y)) - поле и стартовую клетку робота, по умолчанию (0, 0).
+    """
+    rows = [line.strip() for line in text.splitlines()]
+    rows = [row for row in rows if row and not row.startswith(';')]
+    size = len(rows)
+    if size == 0:
+        raise Exception("Поле пустое")
+
+    field = Field(size)
+    start = (0, 0)
+    for y, row in enumerate(rows):
+        if len(row) != size:
+            raise Exception(f"Поле должно быть квадратным: ряд {y + 1} длиной {len(row)}, ожидалось {size}")
+        for x, char in enumerate(row):
+            if char == ROBOT_CHAR:
+                start = (x, y)
+            elif char in FIELD_CHARS:
+                if char != '.':
+                    field.set(x, y, FIELD_CHARS[char])
+            else:
+                raise Exception(f"Неизвестный символ '{char}' в ряду {y + 1} поля")
+    return field, start
+
+
+def field_to_text(field, robot=None):
+    """Текстовый вид поля; robot - клетка (x, y), отмечаемая символом робота"""
+    rows = []
+    for y in range(field.size):
+        row = [CELL_CHARS[code] for code in field.row(y)]
+        if robot is not None and robot[1] == y:
+            row[robot[0]] = ROBOT_CHAR
+        rows.append(''.join(row))
+    return '\n'.join(rows) + '\n'
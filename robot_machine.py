@@ -0,0 +1,356 @@
+# Исполнитель байт-кода Робота без графического интерфейса.
+# Не зависит от PyQt6: используется и вкладкой RobotExecutor, и пакетной проверкой robot_batch.
+
+import time
+
+from robot_parser import ProgramError
+from robot_trace import COMMAND_MARK
+from robot_compiler import (Program, OP_MOVE, OP_MARK, OP_JUMP, OP_JUMP_IF_FALSE, OP_JUMP_IF_TRUE,
+                            OP_FOR_INIT, OP_FOR_TEST_UP, OP_FOR_TEST_DOWN, OP_FOR_STEP, OP_MOVE_N,
+                            MOVE_NAMES, DX, DY, sensor_table)
+
+# Направления робота (совпадают со значениями Direction)
+UP, RIGHT, DOWN, LEFT = 0, 1, 2, 3
+
+# Таблицы истинности условия "в сторону side свободно"
+FREE_TABLES = tuple(sensor_table(side, False) for side in (UP, RIGHT, DOWN, LEFT))
+
+
+class ExecutionLimitError(Exception):
+    """Превышен лимит шагов или времени выполнения"""
+
+
+class InfiniteLoopError(ProgramError):
+    """Программа зациклилась: состояние выполнения повторилось. line - строка цикла"""
+
+    def __init__(self, line):
+        super().__init__(line, "программа зациклилась - робот и поле возвращаются в уже "
+                               "пройденное состояние, цикл никогда не завершится")
+
+
+class LoopDetector:
+    """Поиск повторяющегося состояния выполнения (алгоритм Брента).
+
+    Хранится одно сохраненное состояние (RobotMachine.state). Проверка идет
+    после переходов OP_JUMP и OP_JUMP_IF_TRUE: каждый цикл "пока" проходит через
+    один из них на каждой итерации, а циклы "для" конечны. Текущее состояние
+    сравнивается с сохраненным (сначала только счетчик команд), сохраненное
+    заменяется текущим, когда число шагов удваивается. Программа
+    детерминирована, поэтому повтор состояния означает бесконечный цикл, и он
+    находится за время порядка длины пути до цикла плюс двух его периодов.
+    """
+
+    # Первое сохранение состояния - после стольких шагов
+    MIN_INTERVAL = 1024
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.state = None
+        self.pc = -1  # Счетчик команд сохраненного состояния
+        self.next_save = self.MIN_INTERVAL
+
+    def save(self, state, steps):
+        self.state = state
+        self.pc = state[0]
+        self.next_save = max(2 * steps, self.MIN_INTERVAL)
+
+
+class RobotMachine:
+    """Робот на поле Field, выполняющий скомпилированную программу"""
+
+    # Сколько инструкций без действия робота можно выполнить за один шаг
+    MAX_JUMPS_PER_STEP = 1000
+
+    def __init__(self, field, x=0, y=0, direction=RIGHT):
+        self.field = field
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.program = Program((), (), ())
+        self.pc = 0  # Счетчик команд - индекс текущей инструкции байт-кода
+        self.counters = []  # Значения счетчиков циклов "для"
+        self.steps = 0  # Выполнено инструкций с загрузки программы
+        # Клетки (x, y), изменившиеся с последней перерисовки; None - изменения не отслеживаются
+        self.dirty_cells = []
+        self.loop_detector = LoopDetector()
+        self.trace = None  # Запись трассы выполнения (robot_trace.ExecutionTrace)
+
+    def load(self, program):
+        """Загружает программу и сбрасывает состояние выполнения"""
+        self.program = program
+        self.pc = 0
+        self.counters = [0] * len(program.counter_names)
+        self.steps = 0
+        self.loop_detector.reset()
+
+    def start_trace(self, trace):
+        """Начинает запись трассы с текущего состояния. Запись идет до stop_trace"""
+        self.trace = trace
+        trace.start(self)
+
+    def stop_trace(self):
+        """Завершает запись трассы и возвращает ее"""
+        trace, self.trace = self.trace, None
+        if trace is not None:
+            trace.close()
+        return trace
+
+    def restore(self, keyframe):
+        """Восстанавливает состояние выполнения из ключевого кадра трассы.
+
+        Возвращает True, если при этом изменились стены поля.
+        """
+        self.pc = keyframe.pc
+        self.counters = list(keyframe.counters)
+        self.x, self.y, self.direction = keyframe.x, keyframe.y, keyframe.direction
+        self.steps = keyframe.steps
+        return self.field.load_cells(keyframe.field_cells())
+
+    def seek(self, trace, step):
+        """Переводит выполнение в состояние после step шагов трассы trace.
+
+        Состояние восстанавливается из ближайшего предшествующего ключевого
+        кадра, оставшиеся шаги выполняются заново - не больше интервала между
+        кадрами. Трасса при этом не пишется, изменения клеток не отслеживаются
+        (dirty_cells = None). Возвращает True, если изменились стены поля.
+        """
+        keyframe = trace.keyframe_before(step)
+        recording, self.trace = self.trace, None
+        detector, self.loop_detector = self.loop_detector, None
+        self.dirty_cells = None
+        try:
+            walls_changed = self.restore(keyframe)
+            actions = keyframe.step
+            end = len(self.program.code)
+            while actions < step and self.pc < end:
+                if self.advance():
+                    actions += 1
+        finally:
+            self.trace = recording
+            self.loop_detector = detector
+            detector.reset()
+        return walls_changed
+
+    def state(self):
+        """Состояние выполнения, от которого зависит дальнейший ход программы"""
+        return self.pc, tuple(self.counters), self.x, self.y, self.direction, self.field.version
+
+    def check_loop(self):
+        """Выбрасывает InfiniteLoopError, если текущее состояние уже встречалось"""
+        detector = self.loop_detector
+        if detector is None:
+            return
+        if self.pc == detector.pc and self.state() == detector.state:
+            raise InfiniteLoopError(self.loop_line())
+        if self.steps >= detector.next_save:
+            detector.save(self.state(), self.steps)
+
+    def loop_line(self):
+        """Строка зациклившегося цикла.
+
+        Вызывается при повторе состояния: программа проходит один период повтора,
+        и внешний цикл - тот, чей переход назад ведет на наименьший адрес (из
+        нескольких переходов на один адрес - стоящий дальше всех). Поэтому
+        строка не зависит от того, в какой точке периода замечен повтор.
+        После прохода состояние снова то же, счетчик шагов восстанавливается.
+        """
+        state = self.state()
+        steps = self.steps
+        detector, self.loop_detector = self.loop_detector, None
+        trace, self.trace = self.trace, None
+        back_jump = None  # (адрес перехода, адрес инструкции)
+        try:
+            while True:
+                pc = self.pc
+                self.execute_instruction()
+                if self.pc <= pc and (back_jump is None or (self.pc, -pc) < (back_jump[0], -back_jump[1])):
+                    back_jump = (self.pc, pc)
+                if self.pc == state[0] and self.state() == state:
+                    break
+        finally:
+            self.loop_detector = detector
+            self.trace = trace
+            self.steps = steps
+        return self.program.lines[back_jump[1]]
+
+    @property
+    def finished(self):
+        return self.pc >= len(self.program.code)
+
+    def check_condition(self, condition):
+        """Проверяет условие по таблице истинности (см. robot_compiler.condition_table)"""
+        return bool(condition >> self.field.mask(self.x, self.y) & 1)
+
+    def move(self, direction):
+        """Перемещает робота в направлении direction"""
+        x, y = self.x, self.y
+        self.direction = direction
+        # Старая клетка перерисовывается в любом случае - меняется направление робота
+        dirty = self.dirty_cells
+        if dirty is not None:
+            dirty.append((x, y))
+
+        # Проверка границ и стен по маске соседей
+        if self.field.mask(x, y) >> direction & 1:
+            raise self.blocked(direction)
+
+        self.x = x + DX[direction]
+        self.y = y + DY[direction]
+        if dirty is not None:
+            dirty.append((self.x, self.y))
+
+    @staticmethod
+    def blocked(direction):
+        return Exception(f"Робот не может двигаться {MOVE_NAMES[direction]} - там стена или граница!")
+
+    def mark(self):
+        self.field.mark(self.x, self.y)
+        if self.dirty_cells is not None:
+            self.dirty_cells.append((self.x, self.y))
+
+    def execute_instruction(self):
+        """Выполняет одну инструкцию байт-кода.
+
+        Возвращает True, если инструкция была действием робота (ход или закраска).
+        """
+        op, a, b, c = self.program.code[self.pc]
+        self.steps += 1
+
+        if op == OP_MOVE:
+            self.move(a)
+            self.pc += 1
+            if self.trace is not None:
+                self.trace.record(a, self.pc - 1, self)
+            return True
+        if op == OP_JUMP_IF_FALSE:
+            self.pc = self.pc + 1 if self.check_condition(a) else b
+        elif op == OP_JUMP:
+            self.pc = a
+            self.check_loop()
+        elif op == OP_MARK:
+            self.mark()
+            self.pc += 1
+            if self.trace is not None:
+                self.trace.record(COMMAND_MARK, self.pc - 1, self)
+            return True
+        elif op == OP_JUMP_IF_TRUE:
+            if self.check_condition(a):
+                self.pc = b
+                self.check_loop()
+            else:
+                self.pc += 1
+        elif op == OP_FOR_STEP:
+            self.counters[a] += b
+            self.pc = c
+        elif op == OP_FOR_TEST_UP:
+            self.pc = self.pc + 1 if self.counters[a] <= b else c
+        elif op == OP_FOR_TEST_DOWN:
+            self.pc = self.pc + 1 if self.counters[a] >= b else c
+        elif op == OP_FOR_INIT:
+            self.counters[a] = b
+            self.pc += 1
+        return False
+
+    def execute_fused(self, instruction, limit=None):
+        """Выполняет составную инструкцию из Program.fast_code.
+
+        Результат тот же, что у исходных инструкций, включая ошибку хода в стену
+        и счетчик шагов. limit - сколько исходных инструкций еще можно выполнить
+        (None - без ограничения); инструкция выполняется не дальше лимита.
+        Возвращает число выполненных исходных инструкций, 0 - составная инструкция
+        не применима и нужно выполнить исходную. Клетки не отмечаются в dirty_cells.
+        """
+        op, direction, a, b = instruction
+        x, y = self.x, self.y
+
+        if op == OP_MOVE_N:
+            count = a if limit is None else min(a, limit)
+            if count < 2:
+                return 0
+            free = self.field.free_distance(x, y, direction)
+            self.direction = direction
+            if free < count:
+                # Ход в стену: робот останавливается перед ней, счетчик команд - на ошибочном ходе
+                self.x, self.y = x + DX[direction] * free, y + DY[direction] * free
+                self.pc += free
+                self.steps += free + 1
+                raise self.blocked(direction)
+            self.x, self.y = x + DX[direction] * count, y + DY[direction] * count
+            self.pc += count
+            self.steps += count
+            return count
+
+        # OP_WALK: каждая пройденная клетка - проверка, ход и переход, в конце - последняя проверка
+        if a == FREE_TABLES[direction]:
+            cells = self.field.free_distance(x, y, direction)
+        else:
+            cells = self.field.run_length(x, y, direction, a)
+        done = 3 * cells + 1
+        if limit is not None and done > limit:
+            # До лимита успеваем пройти только часть клеток, дальше - исходные инструкции
+            cells = limit // 3
+            if not cells:
+                return 0
+            done = 3 * cells
+        else:
+            self.pc = b
+        if cells:
+            self.direction = direction
+            self.x, self.y = x + DX[direction] * cells, y + DY[direction] * cells
+        self.steps += done
+        return done
+
+    def advance(self):
+        """Выполняет инструкции до ближайшего действия робота (один шаг воспроизведения).
+
+        Возвращает True, если действие выполнено.
+        """
+        end = len(self.program.code)
+        # Ограничиваем число переходов за шаг, чтобы пустой цикл не завесил интерфейс
+        for _ in range(self.MAX_JUMPS_PER_STEP):
+            if self.pc >= end:
+                break
+            if self.execute_instruction():
+                return True
+        return False
+
+    def run(self, max_steps=None, time_limit=None):
+        """Выполняет инструкции в цикле до конца программы.
+
+        Выполняется оптимизированный байт-код (Program.fast_code), шаги считаются
+        по исходным инструкциям. При записи трассы - исходный байт-код, чтобы
+        записать каждый ход. max_steps ограничивает число выполненных
+        инструкций, time_limit - время выполнения в секундах. При превышении
+        лимита выбрасывается ExecutionLimitError, при зацикливании -
+        InfiniteLoopError. Возвращает количество выполненных инструкций.
+        """
+        code = self.program.fast_code if self.trace is None else self.program.code
+        end = len(code)
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        next_check = 0
+        steps = 0
+        # Изменения не отслеживаем по клеткам - после выполнения поле перерисуется целиком
+        self.dirty_cells = None
+
+        while self.pc < end:
+            if max_steps is not None and steps >= max_steps:
+                raise ExecutionLimitError(f"Превышен лимит шагов ({max_steps})")
+            # Время проверяем раз в 1024 шага, чтобы не замедлять цикл
+            if deadline is not None and steps >= next_check:
+                if time.perf_counter() > deadline:
+                    raise ExecutionLimitError(f"Превышен лимит времени ({time_limit} с)")
+                next_check = steps + 1024
+
+            instruction = code[self.pc]
+            if instruction[0] >= OP_MOVE_N:
+                done = self.execute_fused(instruction, None if max_steps is None else max_steps - steps)
+                if done:
+                    steps += done
+                    continue
+
+            self.execute_instruction()
+            steps += 1
+
+        return steps
@@ -0,0 +1,494 @@
+# Лексер и рекурсивный парсер языка Робота.
+# Текст программы превращается в типизированное дерево (AST) за один проход,
+# вложенность циклов и условий не ограничена.
+
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import NamedTuple, Optional, Tuple
+
+# Направления движения (совпадают со значениями Direction)
+MOVE_WORDS = {'вверх': 0, 'вправо': 1, 'вниз': 2, 'влево': 3}
+# Стороны для условий, в том же порядке, что и направления
+SIDE_WORDS = {'сверху': 0, 'справа': 1, 'снизу': 2, 'слева': 3}
+STATE_WORDS = {'свободно': False, 'стена': True}
+
+# Слова, закрывающие блок
+CLOSING_WORDS = ('кц', 'все', 'иначе')
+# Слова, с которых начинается команда
+STATEMENT_WORDS = frozenset(MOVE_WORDS) | {'закрасить', 'нц', 'если'}
+
+TOKEN_RE = re.compile(r'(?P<comment>\|.*)|(?P<number>-?\d+)|(?P<word>\w+)|(?P<symbol>\S)')
+
+# Категории слов для подсветки синтаксиса
+HIGHLIGHT_WORDS = {
+    **dict.fromkeys(('нц', 'кц', 'пока', 'если', 'то', 'иначе', 'все', 'выбор', 'при', 'и', 'или', 'не', 'для',
+                     'от', 'до', 'шаг'), 'keyword'),
+    **dict.fromkeys(('вверх', 'вниз', 'влево', 'вправо', 'закрасить', 'свободно', 'слева', 'справа', 'сверху',
+                     'снизу'), 'command'),
+    **dict.fromkeys(('стена', 'краска', 'не_stena', 'не_краска'), 'condition'),
+}
+
+
+class ProgramError(Exception):
+    """Ошибка в тексте программы. line - номер строки, к которой относится ошибка"""
+
+    def __init__(self, line, message):
+        super().__init__(f"Строка {line}: {message}")
+        self.line = line
+
+
+class Token(NamedTuple):
+    kind: str   # 'word', 'number', 'symbol', 'comment' (только в lex_line) или 'eof'
+    text: str
+    line: int
+    column: int
+
+
+@dataclass(frozen=True)
+class Sensor:
+    """Условие 'сторона свободно/стена'"""
+    side: int
+    wall: bool
+
+
+@dataclass(frozen=True)
+class Not:
+    operand: object
+
+
+@dataclass(frozen=True)
+class And:
+    left: object
+    right: object
+
+
+@dataclass(frozen=True)
+class Or:
+    left: object
+    right: object
+
+
+@dataclass(frozen=True)
+class Move:
+    direction: int
+    line: int
+
+
+@dataclass(frozen=True)
+class Mark:
+    line: int
+
+
+@dataclass(frozen=True)
+class While:
+    condition: object  # Sensor, Not, And или Or
+    body: Tuple
+    line: int
+
+
+@dataclass(frozen=True)
+class DoWhile:
+    condition: Optional[object]  # None для "нц ... кц" - тело выполняется один раз
+    body: Tuple
+    line: int
+
+
+@dataclass(frozen=True)
+class For:
+    var_name: str
+    start: int
+    end: int
+    step: int
+    body: Tuple
+    line: int
+
+
+@dataclass(frozen=True)
+class If:
+    condition: object
+    then_body: Tuple
+    else_body: Tuple
+    line: int
+
+
+def tokenize_line(text, line=1):
+    """Разбивает одну строку на токены, комментарии '|' отбрасываются"""
+    tokens = []
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind != 'comment':
+            tokens.append(Token(kind, match.group(), line, match.start()))
+    return tokens
+
+
+def lex_line(text):
+    """Токены одной строки, включая комментарии, с номером строки 0.
+
+    Общий лексер подсветки и парсера: строка разбирается один раз, а номер
+    строки проставляется при разборе программы (см. IncrementalParser).
+    """
+    return tuple(Token(match.lastgroup, match.group(), 0, match.start()) for match in TOKEN_RE.finditer(text))
+
+
+def highlight_spans(tokens):
+    """Участки строки для подсветки по токенам из lex_line: список (начало, длина, категория).
+
+    Категории: 'keyword', 'command', 'condition', 'number', 'comment'.
+    Слова, не относящиеся к языку, и символы пропускаются.
+    """
+    spans = []
+    words = HIGHLIGHT_WORDS
+    for kind, text, _, column in tokens:
+        if kind == 'word':
+            kind = words.get(text)
+            if kind is None:
+                continue
+        elif kind == 'symbol':
+            continue
+        spans.append((column, len(text), kind))
+    return spans
+
+
+def tokenize(code):
+    """Разбивает текст программы на токены, последним идет токен 'eof'"""
+    tokens = []
+    lines = code.split('\n')
+    for number, text in enumerate(lines, 1):
+        tokens.extend(tokenize_line(text, number))
+    tokens.append(Token('eof', '', len(lines), 0))
+    return tokens
+
+
+class Parser:
+    """Рекурсивный парсер программы Робота.
+
+    Переводы строк не значимы: команды разделяются пробелами, поэтому
+    "нц пока справа свободно вправо кц" можно записать в одну строку.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def advance(self):
+        token = self.tokens[self.pos]
+        if token.kind != 'eof':
+            self.pos += 1
+        return token
+
+    def error(self, token, message):
+        return ProgramError(token.line, message)
+
+    def expect_word(self, word):
+        token = self.advance()
+        if token.text != word:
+            raise self.error(token, f"ожидалось '{word}', найдено {self.describe(token)}")
+        return token
+
+    def expect_number(self):
+        token = self.advance()
+        if token.kind != 'number':
+            raise self.error(token, f"ожидалось число, найдено {self.describe(token)}")
+        return int(token.text)
+
+    def describe(self, token):
+        return "конец программы" if token.kind == 'eof' else f"'{token.text}'"
+
+    def parse(self):
+        body = self.parse_block()
+        token = self.peek()
+        if token.kind != 'eof':
+            if token.text == 'иначе':
+                raise self.error(token, "'иначе' без соответствующего 'если'")
+            expected = 'нц' if token.text == 'кц' else 'если'
+            raise self.error(token, f"'{token.text}' без начала блока '{expected}'")
+        return body
+
+    def parse_block(self):
+        """Разбирает команды до закрывающего слова или конца программы"""
+        statements = []
+        while True:
+            token = self.peek()
+            if token.kind == 'eof' or token.text in CLOSING_WORDS:
+                return tuple(statements)
+            statements.append(self.parse_statement())
+
+    def close_block(self, opener, word):
+        """Проверяет, что блок, начатый токеном opener, закрыт словом word"""
+        token = self.peek()
+        if token.text == word:
+            return self.advance()
+        if token.kind == 'eof':
+            if word == 'кц':
+                raise self.error(opener, "не найден конец цикла 'кц'")
+            raise self.error(opener, "не найден конец условия 'все'")
+        if token.text == 'иначе':
+            raise self.error(token, "'иначе' без соответствующего 'если'")
+        raise self.error(token, f"найдено '{token.text}', но блок '{opener.text}' "
+                                f"в строке {opener.line} не закрыт")
+
+    def parse_statement(self):
+        token = self.advance()
+        word = token.text
+
+        if word in MOVE_WORDS:
+            return Move(MOVE_WORDS[word], token.line)
+        if word == 'закрасить':
+            return Mark(token.line)
+        if word == 'нц':
+            return self.parse_loop(token)
+        if word == 'если':
+            return self.parse_if(token)
+        raise self.error(token, f"неизвестная команда {self.describe(token)}")
+
+    def parse_loop(self, opener):
+        # Цикл с предусловием "нц пока ... кц"
+        if self.peek().text == 'пока':
+            self.advance()
+            condition = self.parse_condition()
+            body = self.parse_block()
+            self.close_block(opener, 'кц')
+            return While(condition, body, opener.line)
+
+        # Цикл со счетчиком "нц для i от 1 до 5 [шаг 2] ... кц"
+        if self.peek().text == 'для':
+            self.advance()
+            name = self.advance()
+            if name.kind != 'word':
+                raise self.error(name, "Неверный формат цикла для. Пример: 'нц для i от 1 до 5'")
+            self.expect_word('от')
+            start = self.expect_number()
+            self.expect_word('до')
+            end = self.expect_number()
+            step = 1
+            if self.peek().text == 'шаг':
+                self.advance()
+                step = self.expect_number()
+            body = self.parse_block()
+            self.close_block(opener, 'кц')
+            return For(name.text, start, end, step, body, opener.line)
+
+        # Цикл с постусловием "нц ... кц при ..."
+        body = self.parse_block()
+        self.close_block(opener, 'кц')
+        condition = None
+        if self.peek().text == 'при':
+            self.advance()
+            condition = self.parse_condition()
+        return DoWhile(condition, body, opener.line)
+
+    def parse_if(self, opener):
+        condition = self.parse_condition()
+        self.expect_word('то')
+        then_body = self.parse_block()
+        else_body = ()
+        if self.peek().text == 'иначе':
+            self.advance()
+            else_body = self.parse_block()
+        self.close_block(opener, 'все')
+        return If(condition, then_body, else_body, opener.line)
+
+    def parse_condition(self):
+        """условие := и-условие {'или' и-условие}"""
+        condition = self.parse_and()
+        while self.peek().text == 'или':
+            self.advance()
+            condition = Or(condition, self.parse_and())
+        return condition
+
+    def parse_and(self):
+        """и-условие := не-условие {'и' не-условие}"""
+        condition = self.parse_not()
+        while self.peek().text == 'и':
+            self.advance()
+            condition = And(condition, self.parse_not())
+        return condition
+
+    def parse_not(self):
+        """не-условие := 'не' не-условие | '(' условие ')' | датчик"""
+        token = self.peek()
+        if token.text == 'не':
+            self.advance()
+            return Not(self.parse_not())
+        if token.text == '(':
+            self.advance()
+            condition = self.parse_condition()
+            self.expect_word(')')
+            return condition
+        return self.parse_sensor()
+
+    def parse_sensor(self):
+        side = self.advance()
+        if side.text not in SIDE_WORDS:
+            raise self.error(side, f"неизвестное условие: {self.describe(side)}")
+        state = self.advance()
+        if state.text not in STATE_WORDS:
+            raise self.error(state, f"неизвестное условие: '{side.text}' {self.describe(state)}")
+        return Sensor(SIDE_WORDS[side.text], STATE_WORDS[state.text])
+
+
+def parse_program(code):
+    """Парсит текст программы в кортеж узлов AST"""
+    return Parser(tokenize(code)).parse()
+
+
+def shift_lines(nodes, delta):
+    """Копия узлов AST с номерами строк, сдвинутыми на delta.
+
+    Узлы создаются конструкторами, а не dataclasses.replace - так вдвое быстрее.
+    """
+    shifted = []
+    for node in nodes:
+        kind = type(node)
+        if kind is Move:
+            node = Move(node.direction, node.line + delta)
+        elif kind is Mark:
+            node = Mark(node.line + delta)
+        elif kind is If:
+            node = If(node.condition, shift_lines(node.then_body, delta), shift_lines(node.else_body, delta),
+                      node.line + delta)
+        elif kind is For:
+            node = For(node.var_name, node.start, node.end, node.step, shift_lines(node.body, delta),
+                       node.line + delta)
+        else:
+            node = kind(node.condition, shift_lines(node.body, delta), node.line + delta)
+        shifted.append(node)
+    return tuple(shifted)
+
+
+class IncrementalParser:
+    """Разбор программы, обновляемый по правкам строк.
+
+    Программа делится на сегменты - группы строк с законченными командами
+    верхнего уровня (цикл или условие целиком). edit() заменяет измененные
+    строки и разбирает заново сегменты от предыдущего перед правкой до первого
+    сегмента, граница которого совпала со старой. Остальные сегменты не
+    разбираются: если выше них добавились или удалились строки, номера строк
+    в их AST сдвигаются (shift_lines). Поэтому правка строки в большой
+    программе стоит столько же, сколько разбор одного блока. parse() дает
+    тот же результат, что parse_program для того же текста.
+    """
+
+    def __init__(self):
+        self.lines = []  # Пары (текст строки, токены из lex_line)
+        self.starts = []  # Первая строка каждого сегмента (индексы с 0)
+        # Для каждого сегмента - результат check_segment: (первая строка при разборе, узлы AST, ошибка)
+        self.segments = []
+
+    @staticmethod
+    def split(lines, start=0):
+        """Границы сегментов: генератор пар индексов (первая строка, строка за последней).
+
+        Сегмент заканчивается перед строкой, начинающейся с команды, если все
+        блоки, открытые в сегменте, уже закрыты. Пустые строки и комментарии
+        присоединяются к предыдущему сегменту. start - начало одного из
+        сегментов, с которого продолжить разбиение.
+        """
+        depth = 0
+        has_statements = False
+        for index in range(start, len(lines)):
+            tokens = lines[index][1]
+            first_word = None
+            for token in tokens:
+                if token.kind == 'comment':
+                    continue
+                word = token.text
+                if first_word is None:
+                    first_word = word
+                    if has_statements and depth <= 0 and word in STATEMENT_WORDS:
+                        yield start, index
+                        start = index
+                        depth = 0
+                if word == 'нц' or word == 'если':
+                    depth += 1
+                elif word == 'кц' or word == 'все':
+                    depth -= 1
+            if first_word is not None:
+                has_statements = True
+        yield start, len(lines)
+
+    @staticmethod
+    def parse_segment(lines, start, end):
+        tokens = []
+        for index in range(start, end):
+            line = index + 1
+            for token in lines[index][1]:
+                if token.kind != 'comment':
+                    tokens.append(token._replace(line=line))
+        tokens.append(Token('eof', '', end, 0))
+
+        parser = Parser(tokens)
+        try:
+            return parser.parse()
+        except Exception:
+            # Ошибка на конце сегмента, а не программы: точное сообщение дает разбор до конца программы
+            if end < len(lines) and parser.peek().kind == 'eof':
+                IncrementalParser.parse_segment(lines, start, len(lines))
+            raise
+
+    def check_segment(self, start, end):
+        """Разбор сегмента: (start, узлы AST, None) или (start, None, ProgramError)"""
+        try:
+            return start, self.parse_segment(self.lines, start, end), None
+        except ProgramError as e:
+            return start, None, e
+
+    def edit(self, first, removed, lines):
+        """Заменяет removed строк, начиная с first, на lines и разбирает заново затронутые сегменты"""
+        old = self.lines[first:first + removed]
+        if len(old) == len(lines) and all(old_text == text for (old_text, _), (text, _) in zip(old, lines)):
+            # Текст не изменился (Qt сообщает и об изменении только форматирования)
+            return
+
+        self.lines[first:first + removed] = lines
+        delta = len(lines) - removed
+        changed_end = first + len(lines)  # Первая неизмененная строка после правки
+
+        # Граница сегмента зависит от первой строки следующего, поэтому начинаем с предыдущего сегмента
+        index = max(bisect_right(self.starts, first) - 2, 0)
+        scan_from = self.starts[index] if self.starts else 0
+
+        new_starts = []
+        new_segments = []
+        tail = len(self.starts)
+        for start, end in self.split(self.lines, scan_from):
+            if start >= changed_end:
+                # Дальше строки не менялись: если граница совпала со старой, разбиение тоже совпадет
+                old_index = bisect_left(self.starts, start - delta, index)
+                if old_index < len(self.starts) and self.starts[old_index] == start - delta:
+                    tail = old_index
+                    break
+            new_starts.append(start)
+            new_segments.append(self.check_segment(start, end))
+
+        self.starts[index:] = new_starts + [start + delta for start in self.starts[tail:]]
+        self.segments[index:] = new_segments + self.segments[tail:]
+
+    def segment(self, index):
+        """Результат check_segment сегмента index с номерами строк его текущего положения"""
+        start, nodes, error = self.segments[index]
+        first = self.starts[index]
+        if start != first:
+            if error is None:
+                # Сегмент сдвинулся вместе со строками: номера строк AST сдвигаются без разбора
+                self.segments[index] = first, shift_lines(nodes, first - start), None
+            else:
+                # Номер строки в сообщении устарел - ошибка находится заново
+                end = self.starts[index + 1] if index + 1 < len(self.starts) else len(self.lines)
+                self.segments[index] = self.check_segment(first, end)
+        return self.segments[index]
+
+    def parse(self):
+        """AST программы. Выбрасывает первую ошибку разбора (ProgramError)"""
+        nodes = []
+        for index in range(len(self.segments)):
+            _, segment_nodes, error = self.segment(index)
+            if segment_nodes is None:
+                raise error
+            nodes.extend(segment_nodes)
+        return tuple(nodes)
+
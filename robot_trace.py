@@ -0,0 +1,216 @@
+# Трасса выполнения программы Робота: каждое действие робота (ход или закраска)
+# в компактном двоичном виде и периодические ключевые кадры с полным полем.
+# Трассу пишут вкладка RobotExecutor (для перемотки) и robot_batch (--trace).
+#
+# Формат файла: MAGIC, заголовок HEADER, затем блоки - тег (1 байт), длина (4 байта), данные.
+# Блок STEPS_BLOCK - команды и адреса инструкций очередных шагов, KEYFRAME_BLOCK - Keyframe.pack.
+
+import struct
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
+
+from robot_field import DX, DY
+
+MAGIC = b'RBTRACE2'
+HEADER = struct.Struct('<cI')  # Код типа массива адресов, размер поля
+BLOCK = struct.Struct('<cI')   # Тег и длина блока
+STEPS_BLOCK = b'S'
+KEYFRAME_BLOCK = b'K'
+# Шаг трассы, RobotMachine.steps, pc, x, y, направление, число счетчиков; затем счетчики 'q' и сжатое поле
+KEYFRAME = struct.Struct('<QQIiiBI')
+
+# Команды шагов: 0-3 - ход в направлении (UP, RIGHT, DOWN, LEFT), COMMAND_MARK - закраска
+COMMAND_MARK = 4
+
+
+def write_block(file, tag, data):
+    file.write(BLOCK.pack(tag, len(data)))
+    file.write(data)
+
+
+class Keyframe(NamedTuple):
+    """Полное состояние выполнения перед шагом step"""
+    step: int       # Номер шага трассы
+    steps: int      # RobotMachine.steps - выполнено инструкций
+    pc: int
+    counters: tuple
+    x: int
+    y: int
+    direction: int
+    cells: bytes    # Field.cells, сжатые zlib
+
+    def field_cells(self):
+        return zlib.decompress(self.cells)
+
+    def pack(self):
+        """Данные блока KEYFRAME_BLOCK"""
+        header = KEYFRAME.pack(self.step, self.steps, self.pc, self.x, self.y, self.direction, len(self.counters))
+        return header + array('q', self.counters).tobytes() + self.cells
+
+    @classmethod
+    def unpack(cls, data):
+        step, steps, pc, x, y, direction, count = KEYFRAME.unpack_from(data)
+        end = KEYFRAME.size + count * 8
+        counters = array('q')
+        counters.frombytes(data[KEYFRAME.size:end])
+        return cls(step, steps, pc, tuple(counters), x, y, direction, bytes(data[end:]))
+
+
+class ExecutionTrace:
+    """Трасса выполнения: команда (1 байт) и адрес инструкции (2 или 4 байта) на шаг.
+
+    Положение и направление робота не хранятся - они восстанавливаются по
+    командам от ближайшего ключевого кадра (см. states). Ключевой кадр
+    записывается каждые keyframe_interval шагов. Если задан path, трасса
+    пишется в файл блоками по FLUSH_STEPS шагов: в памяти не накапливаются
+    шаги, но остаются все ключевые кадры - сжатое поле на каждые
+    keyframe_interval шагов.
+    """
+
+    KEYFRAME_INTERVAL = 4096
+    FLUSH_STEPS = 1 << 16
+
+    def __init__(self, path=None, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.file = None
+        self.keyframe_interval = keyframe_interval
+        self.size = 0  # Размер поля
+        self.commands = bytearray()
+        self.pcs = array('I')
+        self.first_step = 0  # Номер первого шага, хранящегося в памяти
+        self.length = 0  # Всего записано шагов
+        self.keyframes = []
+        self.keyframe_steps = []  # Номера шагов ключевых кадров - для поиска bisect
+
+    def __len__(self):
+        return self.length
+
+    def start(self, machine):
+        """Начинает запись: первый ключевой кадр - состояние machine до первого шага"""
+        self.size = machine.field.size
+        # Адреса инструкций укладываются в 2 байта почти в любой программе
+        self.pcs = array('H' if len(machine.program.code) <= 0xFFFF else 'I')
+        if self.path is not None:
+            self.file = open(self.path, 'wb')
+            self.file.write(MAGIC + HEADER.pack(self.pcs.typecode.encode('ascii'), self.size))
+        self.add_keyframe(machine)
+
+    def record(self, command, pc, machine):
+        """Записывает шаг: команда command инструкции pc, machine - состояние после шага"""
+        self.commands.append(command)
+        self.pcs.append(pc)
+        self.length += 1
+        if self.length % self.keyframe_interval == 0:
+            self.add_keyframe(machine)
+        elif self.file is not None and len(self.commands) >= self.FLUSH_STEPS:
+            self.flush()
+
+    def add_keyframe(self, machine):
+        field = machine.field
+        keyframe = Keyframe(self.length, machine.steps, machine.pc, tuple(machine.counters),
+                            machine.x, machine.y, machine.direction, zlib.compress(field.cells, 1))
+        self.add(keyframe)
+        if self.file is not None:
+            self.flush()
+            write_block(self.file, KEYFRAME_BLOCK, keyframe.pack())
+
+    def steps_data(self, start, end):
+        """Данные блока STEPS_BLOCK для шагов [start, end), хранящихся в памяти"""
+        offset = self.first_step
+        return bytes(self.commands[start - offset:end - offset]) + self.pcs[start - offset:end - offset].tobytes()
+
+    def flush(self):
+        """Переносит шаги из памяти в файл"""
+        if self.file is None or not self.commands:
+            return
+        write_block(self.file, STEPS_BLOCK, self.steps_data(self.first_step, self.length))
+        self.commands = bytearray()
+        self.pcs = array(self.pcs.typecode)
+        self.first_step = self.length
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def truncate(self, step):
+        """Удаляет шаги после step (трасса в памяти): выполнение продолжается из прошлого"""
+        if self.first_step:
+            raise Exception("Трасса уже записана в файл при выполнении")
+        del self.commands[step:]
+        del self.pcs[step:]
+        self.length = min(self.length, step)
+        count = bisect_right(self.keyframe_steps, step)
+        del self.keyframes[count:]
+        del self.keyframe_steps[count:]
+
+    def save(self, path):
+        """Сохраняет трассу, записанную в памяти, в файл того же формата"""
+        if self.first_step:
+            raise Exception("Трасса уже записана в файл при выполнении")
+        with open(path, 'wb') as file:
+            file.write(MAGIC + HEADER.pack(self.pcs.typecode.encode('ascii'), self.size))
+            start = 0
+            for keyframe in self.keyframes:
+                if keyframe.step > start:
+                    write_block(file, STEPS_BLOCK, self.steps_data(start, keyframe.step))
+                    start = keyframe.step
+                write_block(file, KEYFRAME_BLOCK, keyframe.pack())
+            if self.length > start:
+                write_block(file, STEPS_BLOCK, self.steps_data(start, self.length))
+
+    @classmethod
+    def load(cls, path):
+        """Читает трассу из файла целиком в память"""
+        trace = cls()
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise Exception(f"Файл {path} не является трассой выполнения Робота")
+            typecode, trace.size = HEADER.unpack(file.read(HEADER.size))
+            trace.pcs = array(typecode.decode('ascii'))
+            while True:
+                header = file.read(BLOCK.size)
+                if len(header) < BLOCK.size:
+                    break
+                tag, length = BLOCK.unpack(header)
+                data = file.read(length)
+                if tag == STEPS_BLOCK:
+                    count = length // (1 + trace.pcs.itemsize)
+                    trace.commands += data[:count]
+                    trace.pcs.frombytes(data[count:])
+                    trace.length += count
+                elif tag == KEYFRAME_BLOCK:
+                    trace.add(Keyframe.unpack(data))
+        return trace
+
+    def add(self, keyframe):
+        self.keyframes.append(keyframe)
+        self.keyframe_steps.append(keyframe.step)
+
+    def keyframe_before(self, step):
+        """Ближайший ключевой кадр не позже шага step"""
+        return self.keyframes[max(bisect_right(self.keyframe_steps, step) - 1, 0)]
+
+    def states(self, start=0, end=None):
+        """Шаги трассы: (номер шага, команда, адрес инструкции, x, y, направление после шага).
+
+        Доступны только шаги, хранящиеся в памяти (для трассы в файле - после load).
+        """
+        end = self.length if end is None else min(end, self.length)
+        keyframe = self.keyframe_before(start)
+        if keyframe.step < self.first_step:
+            raise Exception("Шаги трассы записаны в файл, прочитайте его через ExecutionTrace.load")
+        x, y, direction = keyframe.x, keyframe.y, keyframe.direction
+        offset = self.first_step
+        commands, pcs = self.commands, self.pcs
+        for step in range(keyframe.step, end):
+            command = commands[step - offset]
+            if command != COMMAND_MARK:
+                direction = command
+                x += DX[command]
+                y += DY[command]
+            if step >= start:
+                yield step, command, pcs[step - offset], x, y, direction
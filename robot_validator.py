@@ -0,0 +1,40 @@
+# Проверка программы Робота по мере редактирования.
+# Сегменты программы (см. IncrementalParser) не только разбираются, но и
+# компилируются, после правки заново проверяются только затронутые сегменты.
+
+from robot_parser import IncrementalParser, ProgramError
+from robot_compiler import compile_program
+
+
+class ProgramValidator(IncrementalParser):
+    """Проверка программы, обновляемая по правкам строк (см. IncrementalParser.edit).
+
+    Для каждого сегмента хранится и ошибка компиляции: она сохраняется вместе
+    с узлами AST, а ошибка разбора - без них.
+    """
+
+    def check_segment(self, start, end):
+        """Разбор и компиляция сегмента: (start, узлы AST или None, ProgramError или None)"""
+        start, nodes, error = super().check_segment(start, end)
+        if error is None:
+            try:
+                compile_program(nodes)
+            except ProgramError as e:
+                error = e
+        return start, nodes, error
+
+    def first_error(self):
+        """Первая ошибка программы (ProgramError) или None.
+
+        Как и при запуске, ошибки разбора сообщаются раньше ошибок компиляции.
+        """
+        compile_error = None
+        for index in range(len(self.segments)):
+            _, nodes, error = self.segment(index)
+            if error is None:
+                continue
+            if nodes is None:
+                return error
+            if compile_error is None:
+                compile_error = error
+        return compile_error
@@ -0,0 +1,553 @@
+# Тесты ядра Робота без PyQt6: инкрементальный разбор и проверка программы,
+# оптимизированный байт-код, поиск зацикливания, трасса выполнения.
+# Запуск: python -m pytest tests
+
+import os
+import csv
+import json
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_parser import parse_program, lex_line, IncrementalParser, ProgramError
+from robot_compiler import compile_program, Program, condition_table
+from robot_validator import ProgramValidator
+from robot_field import Field, EMPTY, WALL, MARKED, DX, DY
+from robot_machine import RobotMachine, InfiniteLoopError
+from robot_trace import ExecutionTrace
+from compile_cache import DiskCache, CACHE_DIR_NAME
+import robot_batch
+
+COMMANDS = ['вправо', 'влево', 'вверх', 'вниз', 'закрасить', '', '| комментарий']
+# Строки, которые по отдельности ломают программу: начала и концы блоков, ошибки
+BROKEN_LINES = ['нц', 'кц', 'если сверху стена то', 'иначе', 'все', 'нц пока', 'если то', 'прыгнуть']
+
+
+def random_block(rng, depth=0):
+    """Строки законченной команды: простой команды, цикла или условия"""
+    kind = rng.randrange(6) if depth < 2 else 0
+    if kind == 0 or kind == 5:
+        return [rng.choice(COMMANDS)]
+    body = [line for _ in range(rng.randrange(1, 4)) for line in random_block(rng, depth + 1)]
+    if kind == 1:
+        return ['нц пока справа свободно'] + body + ['кц']
+    if kind == 2:
+        return ['нц для i от 1 до 3'] + body + ['кц']
+    if kind == 3:
+        return ['нц'] + body + ['кц при не снизу стена']
+    return ['если справа свободно и снизу стена то'] + body + ['иначе', 'влево', 'все']
+
+
+def random_lines(rng, count):
+    """Программа из count законченных команд"""
+    return [line for _ in range(count) for line in random_block(rng)]
+
+
+def random_edit(rng, texts):
+    """Случайная правка: (первая строка, удалено строк, новые строки).
+
+    Чаще вставляются законченные команды, иногда - строка, ломающая программу.
+    """
+    first = rng.randrange(len(texts) + 1)
+    removed = rng.randrange(min(3, len(texts) - first) + 1)
+    if rng.random() < 0.3:
+        return first, removed, [rng.choice(BROKEN_LINES)]
+    return first, removed, random_lines(rng, rng.randrange(3))
+
+
+def edits(rng, texts, count):
+    """Случайные правки строк texts на месте: генератор (первая строка, удалено строк, новые строки).
+
+    Правка, сломавшая программу, обычно отменяется следующей, как при наборе текста.
+    """
+    undo = None
+    for _ in range(count):
+        if undo is not None and rng.random() < 0.9:
+            first, removed, new = undo
+        else:
+            first, removed, new = random_edit(rng, texts)
+        old = texts[first:first + removed]
+        texts[first:first + removed] = new
+        undo = (first, len(new), old) if full_parse(texts)[1] is not None else None
+        yield first, removed, new
+
+
+def lexed(texts):
+    return [(text, lex_line(text)) for text in texts]
+
+
+def full_parse(texts):
+    """AST и текст ошибки разбора всей программы"""
+    try:
+        return parse_program('\n'.join(texts)), None
+    except ProgramError as e:
+        return None, str(e)
+
+
+def full_check(texts):
+    """Текст первой ошибки при разборе и компиляции всей программы или None"""
+    try:
+        compile_program(parse_program('\n'.join(texts)))
+    except ProgramError as e:
+        return str(e)
+    return None
+
+
+# Программа из законченных блоков, на которой разбор заведомо успешен
+VALID_PROGRAM = """нц пока справа свободно
+  вправо
+  закрасить
+кц
+если снизу стена то
+  вверх
+иначе
+  вниз
+все
+нц для i от 1 до 3
+  влево
+кц
+"""
+
+
+class CountingParser(IncrementalParser):
+    """IncrementalParser, считающий разобранные сегменты"""
+
+    def __init__(self):
+        super().__init__()
+        self.checked = 0
+
+    def check_segment(self, start, end):
+        self.checked += 1
+        return super().check_segment(start, end)
+
+
+def test_incremental_parser_shifts_segments_after_edit():
+    texts = (VALID_PROGRAM * 3).split('\n')
+    parser = IncrementalParser()
+    parser.edit(0, 0, lexed(texts))
+    parser.parse()
+    texts.insert(0, 'вниз')
+    parser.edit(0, 0, lexed(['вниз']))
+    assert parser.parse() == parse_program('\n'.join(texts))
+
+
+def test_incremental_parser_reparses_only_edited_segments():
+    texts = (VALID_PROGRAM * 1000).split('\n')
+    parser = CountingParser()
+    parser.edit(0, 0, lexed(texts))
+    parser.parse()
+    parser.checked = 0
+    # Правка строки внутри блока в середине программы и вставка строки перед ним
+    middle = texts.index('  вправо', len(texts) // 2)
+    texts[middle] = 'влево'
+    parser.edit(middle, 1, lexed(['влево']))
+    texts.insert(middle, 'вверх')
+    parser.edit(middle, 0, lexed(['вверх']))
+    assert parser.checked <= 6
+    assert parser.parse() == parse_program('\n'.join(texts))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_incremental_parser_matches_full_parse(seed):
+    rng = random.Random(seed)
+    texts = random_lines(rng, rng.randrange(1, 30))
+    parser = IncrementalParser()
+    parser.edit(0, 0, lexed(texts))
+    for first, removed, new in edits(rng, texts, 40):
+        parser.edit(first, removed, lexed(new))
+        expected, error = full_parse(texts)
+        if error is None:
+            assert parser.parse() == expected
+        else:
+            with pytest.raises(ProgramError) as info:
+                parser.parse()
+            assert str(info.value) == error
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_validator_matches_full_check(seed):
+    rng = random.Random(seed)
+    texts = random_lines(rng, rng.randrange(1, 30))
+    validator = ProgramValidator()
+    validator.edit(0, 0, lexed(texts))
+    for first, removed, new in edits(rng, texts, 40):
+        validator.edit(first, removed, lexed(new))
+        error = validator.first_error()
+        assert (None if error is None else str(error)) == full_check(texts)
+
+
+# Таблицы истинности, посчитанные вручную: бит mask установлен, если условие истинно
+# при маске стен mask (сверху - бит 0, справа - 1, снизу - 2, слева - 3)
+CONDITION_TABLES = [
+    ('сверху стена', 0xAAAA),
+    ('справа стена', 0xCCCC),
+    ('снизу стена', 0xF0F0),
+    ('слева стена', 0xFF00),
+    ('слева свободно', 0x00FF),
+    ('не сверху стена', 0x5555),
+    ('не не слева свободно', 0x00FF),
+    # 'не' сильнее 'и': (не сверху стена) и справа стена
+    ('не сверху стена и справа стена', 0x4444),
+    # 'и' сильнее 'или': сверху стена или (справа стена и снизу стена)
+    ('сверху стена или справа стена и снизу стена', 0xEAEA),
+    ('сверху свободно и справа свободно или слева стена', 0xFF11),
+    ('(сверху стена или справа стена) и снизу стена', 0xE0E0),
+    ('не (сверху стена или справа стена)', 0x1111),
+    ('((снизу стена))', 0xF0F0),
+    ('сверху стена и справа стена и снизу стена и слева стена', 0x8000),
+    ('сверху свободно или сверху стена', 0xFFFF),
+]
+
+
+def condition_of(text):
+    return parse_program(f"если {text} то\nвправо\nвсе")[0].condition
+
+
+@pytest.mark.parametrize('text, table', CONDITION_TABLES)
+def test_condition_table(text, table):
+    assert condition_table(condition_of(text)) == table
+
+
+@pytest.mark.parametrize('text, line, message', [
+    ('сверху то', 2, "неизвестное условие: 'сверху' 'то'"),
+    ('не то', 2, "неизвестное условие: 'то'"),
+    ('и сверху стена то', 2, "неизвестное условие: 'и'"),
+    ('сверху стена и то', 2, "неизвестное условие: 'то'"),
+    ('сверху стена или или снизу свободно то', 2, "неизвестное условие: 'или'"),
+    ('(сверху стена то', 2, "ожидалось ')', найдено 'то'"),
+    ('сверху стена) то', 2, "ожидалось 'то', найдено ')'"),
+    ('() то', 2, "неизвестное условие: ')'"),
+    ('сверху стена снизу стена то', 2, "ожидалось 'то', найдено 'снизу'"),
+])
+def test_condition_syntax_errors(text, line, message):
+    with pytest.raises(ProgramError) as info:
+        parse_program(f"вправо\nесли {text}\nвправо\nвсе")
+    assert info.value.line == line
+    assert str(info.value) == f"Строка {line}: {message}"
+
+
+# Команды программ для выполнения: серии ходов и циклы "идти, пока свободно" сворачиваются оптимизатором
+MOVES = ['вправо', 'влево', 'вверх', 'вниз']
+SIDES = ['справа', 'слева', 'сверху', 'снизу']
+
+
+def random_run_block(rng, depth=0):
+    """Строки законченной команды программы для выполнения"""
+    kind = rng.randrange(7) if depth < 2 else rng.randrange(3)
+    if kind == 0:
+        return [rng.choice(MOVES)] * rng.randrange(1, 6)
+    if kind == 1:
+        return ['закрасить']
+    if kind == 2:
+        side = rng.randrange(4)
+        condition = rng.choice([f'{SIDES[side]} свободно', f'не {SIDES[side]} стена',
+                                f'{SIDES[side]} свободно и {rng.choice(SIDES)} свободно'])
+        return [f'нц пока {condition}', MOVES[side], 'кц']
+    body = [line for _ in range(rng.randrange(1, 4)) for line in random_run_block(rng, depth + 1)]
+    if kind == 3:
+        return [f'нц для i{depth} от 1 до {rng.randrange(1, 5)}'] + body + ['кц']
+    if kind == 4:
+        return [f'нц пока {rng.choice(SIDES)} свободно'] + body + ['кц']
+    if kind == 5:
+        return ['нц'] + body + [f'кц при {rng.choice(SIDES)} стена']
+    return [f'если {rng.choice(SIDES)} стена то'] + body + ['иначе', rng.choice(MOVES), 'все']
+
+
+def random_field(rng, size):
+    field = Field(size)
+    for _ in range(rng.randrange(size * size // 4 + 1)):
+        field.set(rng.randrange(size), rng.randrange(size), WALL)
+    return field
+
+
+def run_result(program, field, start, max_steps):
+    """Итог выполнения: ошибка, положение и направление робота, шаги и клетки поля"""
+    machine = RobotMachine(field.copy(), *start)
+    machine.load(program)
+    try:
+        machine.run(max_steps)
+        error = None
+    except InfiniteLoopError as e:
+        # Зацикливание замечается в любой точке периода: составные инструкции пропускают проверки
+        return type(e), str(e)
+    except Exception as e:
+        error = (type(e), str(e))
+    return error, machine.x, machine.y, machine.direction, machine.pc, machine.steps, bytes(machine.field.cells)
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_fast_code_matches_code(seed):
+    rng = random.Random(seed)
+    texts = [line for _ in range(rng.randrange(1, 8)) for line in random_run_block(rng)]
+    program = compile_program(parse_program('\n'.join(texts)))
+    plain = Program(program.code, program.lines, program.counter_names)
+    for _ in range(5):
+        size = rng.randrange(1, 12)
+        field = random_field(rng, size)
+        free = [(x, y) for y in range(size) for x in range(size) if field.get(x, y) != WALL] or [(0, 0)]
+        start = rng.choice(free)
+        # Лимит шагов обрывает и составные инструкции на середине
+        max_steps = rng.choice([None, rng.randrange(1, 300)])
+        assert run_result(program, field, start, max_steps) == run_result(plain, field, start, max_steps)
+
+
+def compiled_variants(text):
+    """Программа с оптимизированным байт-кодом и та же программа без него"""
+    program = compile_program(parse_program(text))
+    return program, Program(program.code, program.lines, program.counter_names)
+
+
+@pytest.mark.parametrize('size', range(2, 12))
+def test_infinite_loop_is_detected(size):
+    text = "нц пока справа свободно\n  вправо\n  влево\nкц\n"
+    for program in compiled_variants(text):
+        machine = RobotMachine(Field(size))
+        machine.load(program)
+        with pytest.raises(InfiniteLoopError) as info:
+            machine.run(max_steps=100_000)
+        assert info.value.line == 1
+
+
+@pytest.mark.parametrize('size', range(2, 12))
+def test_infinite_loop_reports_outer_loop(size):
+    # Внутренний и внешний циклы переходят назад на один адрес; сообщается внешний
+    text = ("вправо\nнц\n  нц пока справа свободно\n    вправо\n  кц\n"
+            "  нц пока слева свободно\n    влево\n  кц\nкц при сверху стена\n")
+    for program in compiled_variants(text):
+        machine = RobotMachine(Field(size))
+        machine.load(program)
+        with pytest.raises(InfiniteLoopError) as info:
+            machine.run(max_steps=100_000)
+        assert info.value.line == 2
+
+
+def test_long_finite_loop_is_not_reported():
+    # Робот возвращается в ту же клетку, но счетчик цикла каждый раз другой
+    for program in compiled_variants("нц для i от 1 до 5000\n  вправо\n  влево\nкц\n"):
+        machine = RobotMachine(Field(5))
+        machine.load(program)
+        assert machine.run() == 20002
+
+
+# Робот закрашивает ряды поля со стенами: ходы, закраски и циклы "для"
+TRACE_PROGRAM = """нц для k от 1 до 6
+  нц пока справа свободно
+    вправо
+    закрасить
+  кц
+  если снизу свободно то
+    вниз
+  все
+  нц пока слева свободно
+    влево
+  кц
+кц
+"""
+
+
+def trace_field():
+    field = Field(12)
+    for y in range(0, 12, 3):
+        field.set(8, y, WALL)
+    return field
+
+
+def record_trace(path=None):
+    """Выполнение TRACE_PROGRAM по шагам с записью трассы.
+
+    Возвращает трассу и состояния (machine_state) до первого шага и после каждого шага.
+    """
+    machine = RobotMachine(trace_field())
+    machine.load(compile_program(parse_program(TRACE_PROGRAM)))
+    trace = ExecutionTrace(path, keyframe_interval=16)
+    machine.start_trace(trace)
+    states = [machine_state(machine)]
+    while machine.advance():
+        states.append(machine_state(machine))
+    machine.stop_trace()
+    return trace, states
+
+
+def machine_state(machine):
+    """Положение и направление робота, pc, счетчики, число инструкций и клетки поля"""
+    return (machine.x, machine.y, machine.direction, machine.pc, tuple(machine.counters), machine.steps,
+            bytes(machine.field.cells))
+
+
+def test_trace_save_load_round_trip(tmp_path):
+    trace, states = record_trace()
+    assert len(trace) == len(states) - 1
+    assert len(trace.keyframes) == len(trace) // 16 + 1
+
+    trace.save(tmp_path / 'run.trace')
+    streamed, _ = record_trace(tmp_path / 'streamed.trace')
+    for path in ('run.trace', 'streamed.trace'):
+        loaded = ExecutionTrace.load(tmp_path / path)
+        assert len(loaded) == len(trace)
+        assert loaded.size == trace.size
+        assert loaded.commands == trace.commands
+        assert loaded.pcs == trace.pcs
+        assert loaded.keyframes == trace.keyframes
+    assert (tmp_path / 'run.trace').read_bytes() == (tmp_path / 'streamed.trace').read_bytes()
+
+
+def test_trace_states_replay_positions():
+    trace, states = record_trace()
+    replayed = [(x, y, direction) for _, _, _, x, y, direction in trace.states()]
+    assert replayed == [state[:3] for state in states[1:]]
+    # С середины трассы - от ближайшего ключевого кадра
+    assert [step for step, *_ in trace.states(40, 45)] == list(range(40, 45))
+
+
+def test_trace_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'program.kum'
+    path.write_text(TRACE_PROGRAM, encoding='utf-8')
+    with pytest.raises(Exception):
+        ExecutionTrace.load(path)
+
+
+def test_seek_restores_recorded_states():
+    trace, states = record_trace()
+    machine = RobotMachine(trace_field())
+    machine.load(compile_program(parse_program(TRACE_PROGRAM)))
+    rng = random.Random(1)
+    # Переходы вперед и назад, на ключевые кадры и между ними, в начало и в конец
+    for step in [0, len(trace), 16, 15, 17] + [rng.randrange(len(trace) + 1) for _ in range(50)]:
+        machine.seek(trace, step)
+        assert machine_state(machine) == states[step]
+
+
+def test_recording_resumes_after_seek():
+    # Шаг назад и продолжение выполнения: будущее трассы записывается заново
+    expected, _ = record_trace()
+    machine = RobotMachine(trace_field())
+    machine.load(compile_program(parse_program(TRACE_PROGRAM)))
+    trace = ExecutionTrace(keyframe_interval=16)
+    machine.start_trace(trace)
+    for _ in range(60):
+        machine.advance()
+    machine.seek(trace, 30)
+    trace.truncate(30)
+    while machine.advance():
+        pass
+    assert trace.commands == expected.commands
+    assert trace.pcs == expected.pcs
+    assert trace.keyframes == expected.keyframes
+
+
+def test_disk_cache_keeps_extension_and_drops_old_versions(tmp_path):
+    source, other = tmp_path / 'a.cortex', tmp_path / 'a.txt'
+    DiskCache('old').store(str(source), 'k', 'old')
+    DiskCache('new').store(str(other), 'k', 'txt')
+    DiskCache('new').store(str(source), 'k', 'cortex')
+    assert sorted(os.listdir(tmp_path / CACHE_DIR_NAME)) == ['a.cortex.new.pickle', 'a.txt.new.pickle']
+    assert DiskCache('new').load(str(source), 'k') == 'cortex'
+    assert DiskCache('new').load(str(other), 'k') == 'txt'
+    assert DiskCache('new').load(str(source), 'другой ключ') is None
+    assert DiskCache('old').load(str(source), 'k') is None
+
+
+# Программы пакетной проверки: по одной на каждый статус отчета
+BATCH_PROGRAMS = {
+    'ok.kum': "вправо\nзакрасить\n",
+    'error.kum': "вверх\nвверх\n",
+    'loop.robot': "нц пока справа свободно\n  вправо\n  влево\nкц\n",
+    'limit.kum': "нц для i от 1 до 1000000\n  вправо\n  влево\nкц\n",
+    'syntax.kum': "прыгнуть\n",
+}
+BATCH_FIELDS = {
+    'a.field': "R..\n...\n...\n",
+    'b.field': "; робот в центре, под ним стена\n...\n.R.\n.#.\n",
+}
+# (программа, поле): статус, клетка робота и закрашенные клетки
+BATCH_EXPECTED = {
+    ('ok.kum', 'a.field'): ('ok', '1', '0', '1,0'),
+    ('ok.kum', 'b.field'): ('ok', '2', '1', '2,1'),
+    ('error.kum', 'a.field'): ('error', '0', '0', ''),
+    ('error.kum', 'b.field'): ('error', '1', '0', ''),
+    ('loop.robot', 'a.field'): ('loop', '0', '0', ''),
+    ('loop.robot', 'b.field'): ('loop', '1', '1', ''),
+    ('limit.kum', 'a.field'): ('limit', '0', '0', ''),
+    ('limit.kum', 'b.field'): ('limit', '1', '1', ''),
+    ('syntax.kum', 'a.field'): ('syntax', '', '', ''),
+    ('syntax.kum', 'b.field'): ('syntax', '', '', ''),
+}
+
+
+def write_files(directory, files):
+    directory.mkdir()
+    for name, text in files.items():
+        (directory / name).write_text(text, encoding='utf-8')
+
+
+def read_report(path, report_format):
+    """Записи отчета в виде строк, как в CSV: {(программа, поле): (статус, x, y, клетки)}"""
+    with open(path, encoding='utf-8', newline='') as file:
+        if report_format == 'csv':
+            records = list(csv.DictReader(file))
+        else:
+            records = [{**record, 'marked': robot_batch.format_cells(record['marked'] or []),
+                        'x': '' if record['x'] is None else str(record['x']),
+                        'y': '' if record['y'] is None else str(record['y'])} for record in json.load(file)]
+    for record in records:
+        assert str(record['success']) == str(record['status'] == 'ok')
+        assert (record['status'] == 'ok') == (record['error'] == '')
+    return {(record['program'], record['field']): (record['status'], record['x'], record['y'], record['marked'])
+            for record in records}
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+@pytest.mark.parametrize('report_format', ['json', 'csv'])
+def test_batch_main_reports_every_status(tmp_path, jobs, report_format):
+    write_files(tmp_path / 'programs', BATCH_PROGRAMS)
+    write_files(tmp_path / 'fields', BATCH_FIELDS)
+    output = tmp_path / f'report.{report_format}'
+    code = robot_batch.main([str(tmp_path / 'programs'), '--fields', str(tmp_path / 'fields'),
+                             '--format', report_format, '--output', str(output), '--max-steps', '20000',
+                             '--jobs', str(jobs), '--chunk-size', '1'])
+    assert code == 1
+    assert read_report(output, report_format) == BATCH_EXPECTED
+
+
+def test_batch_main_exit_codes(tmp_path):
+    write_files(tmp_path / 'programs', {'ok.kum': BATCH_PROGRAMS['ok.kum'], 'a.field': BATCH_FIELDS['a.field']})
+    output = tmp_path / 'report.json'
+    assert robot_batch.main([str(tmp_path / 'programs'), '--output', str(output)]) == 0
+    assert read_report(output, 'json') == {('ok.kum', 'a.field'): ('ok', '1', '0', '1,0')}
+    (tmp_path / 'empty').mkdir()
+    assert robot_batch.main([str(tmp_path / 'empty')]) == 2
+
+
+def scanned_distance(field, x, y, side):
+    """Расстояние до стены или границы перебором клеток"""
+    distance = 0
+    x, y = x + DX[side], y + DY[side]
+    while 0 <= x < field.size and 0 <= y < field.size and field.get(x, y) != WALL:
+        distance += 1
+        x, y = x + DX[side], y + DY[side]
+    return distance
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_distance_index_matches_scan(seed):
+    rng = random.Random(seed)
+    field = Field(rng.randrange(1, 10))
+    for _ in range(60):
+        action = rng.randrange(10)
+        if action == 0:
+            field.resize(rng.randrange(1, 10))
+        else:
+            for _ in range(rng.randrange(1, 4)):
+                x, y = rng.randrange(field.size), rng.randrange(field.size)
+                if action < 5:
+                    field.toggle_wall(x, y)
+                else:
+                    field.set(x, y, rng.choice((EMPTY, WALL, MARKED)))
+        # wall_distance без таблиц DistanceIndex (после resize) и с ними
+        for distance in (field.wall_distance, field.free_distance, field.wall_distance):
+            assert [distance(x, y, side) for y in range(field.size) for x in range(field.size) for side in range(4)] \
+                == [scanned_distance(field, x, y, side)
+                    for y in range(field.size) for x in range(field.size) for side in range(4)]